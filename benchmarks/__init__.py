@@ -0,0 +1,14 @@
+# pylint: skip-file
+
+import os
+import tempfile
+
+# Settings are read when solarpark is imported. Always point the service at a throwaway database, never at the one
+# configured for it, the benchmarks drop their tables. They run on their own engines, see benchmarks.common.
+os.environ["CONNECTIONSTRING_DB"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'solarpark_service_benchmark.db')}"
+os.environ.setdefault("DOMAIN", "benchmark")
+os.environ.setdefault("API_AUDIENCE", "benchmark")
+os.environ.setdefault("ISSUER", "benchmark")
+os.environ.setdefault("LOOPIA_PASSWORD", "benchmark")
+os.environ.setdefault("LOOPIA_EMAIL_FROM", "benchmark@test.com")
+os.environ.setdefault("ALLOW_ORIGINS", "benchmark")
@@ -0,0 +1,156 @@
+# pylint: disable=R0914
+
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from solarpark import persistence
+from solarpark.persistence.database import Base
+from solarpark.persistence.models.dividends import Dividend
+from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.shares import Share
+from solarpark.settings import settings
+
+PAYMENT_YEAR = 2023
+DIVIDEND_PER_SHARE = 150
+
+# Dropped and recreated by every run, the benchmarks never touch the database configured for the service
+SQLITE_URL = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'solarpark_benchmark.db')}"
+
+
+def benchmark_engine() -> Engine:
+    """
+    The database to benchmark on: BENCHMARK_POSTGRES_URL when set, a temporary SQLite file otherwise.
+    """
+    return create_engine(os.environ.get("BENCHMARK_POSTGRES_URL") or SQLITE_URL)
+
+
+def use_database(bind: Engine):
+    # The dividend jobs open their sessions through SessionLocal
+    persistence.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+
+
+def reset_database(bind: Engine):
+    Base.metadata.drop_all(bind=bind)
+    Base.metadata.create_all(bind=bind)
+
+
+def seed_reinvesting_members(bind: Engine, nr_of_members: int, shares_per_member: int, reinvested_per_member: int):
+    """
+    Members that all reinvest, with an account balance large enough to buy reinvested_per_member new shares each.
+    """
+    with bind.begin() as conn:
+        conn.execute(
+            insert(Dividend),
+            [{"dividend_per_share": DIVIDEND_PER_SHARE, "payment_year": PAYMENT_YEAR, "completed": False}],
+        )
+        conn.execute(
+            insert(Member),
+            [{"id": member_id, "email": f"member{member_id}@test.com"} for member_id in range(1, nr_of_members + 1)],
+        )
+        conn.execute(
+            insert(Share),
+            [
+                {
+                    "member_id": member_id,
+                    "initial_value": settings.SHARE_PRICE,
+                    "current_value": settings.SHARE_PRICE,
+                    "purchased_at": datetime(PAYMENT_YEAR - 1, 1, 1),
+                    "from_internal_account": False,
+                }
+                for member_id in range(1, nr_of_members + 1)
+                for _ in range(shares_per_member)
+            ],
+        )
+        conn.execute(
+            insert(Economics),
+            [
+                {
+                    "member_id": member_id,
+                    "nr_of_shares": shares_per_member,
+                    "total_investment": shares_per_member * settings.SHARE_PRICE,
+                    "current_value": shares_per_member * settings.SHARE_PRICE,
+                    "reinvested": 0,
+                    "account_balance": reinvested_per_member * settings.SHARE_PRICE,
+                    "pay_out": False,
+                    "disbursed": 0,
+                    "last_dividend_year": PAYMENT_YEAR - 1,
+                }
+                for member_id in range(1, nr_of_members + 1)
+            ],
+        )
+
+
+def seed_population(bind: Engine, nr_of_members: int, nr_of_shares: int, seed: int = 0, chunk_size: int = 10000):
+    """
+    A membership like the real one: every member has at least one share and the rest are spread randomly, shares
+    are bought over the ten years before the payment year and partly written down already, and about a third of
+    the members are paid out while the rest reinvest. Rows are inserted chunk_size members at a time.
+    """
+    rng = random.Random(seed)
+    shares_per_member = [1] * nr_of_members
+    for _ in range(nr_of_shares - nr_of_members):
+        shares_per_member[rng.randrange(nr_of_members)] += 1
+
+    with bind.begin() as conn:
+        conn.execute(
+            insert(Dividend),
+            [{"dividend_per_share": DIVIDEND_PER_SHARE, "payment_year": PAYMENT_YEAR, "completed": False}],
+        )
+
+    for first_member_id in range(1, nr_of_members + 1, chunk_size):
+        member_ids = range(first_member_id, min(first_member_id + chunk_size, nr_of_members + 1))
+        members, shares, economics = [], [], []
+        for member_id in member_ids:
+            members.append({"id": member_id, "email": f"member{member_id}@test.com"})
+
+            member_shares = []
+            for _ in range(shares_per_member[member_id - 1]):
+                purchased_at = datetime(PAYMENT_YEAR - 10, 1, 1) + timedelta(days=rng.randrange(3650))
+                member_shares.append(
+                    {
+                        "member_id": member_id,
+                        "initial_value": settings.SHARE_PRICE,
+                        "current_value": max(
+                            settings.SHARE_PRICE - DIVIDEND_PER_SHARE * (PAYMENT_YEAR - 1 - purchased_at.year), 0
+                        ),
+                        "purchased_at": purchased_at,
+                        "from_internal_account": rng.random() < 0.2,
+                    }
+                )
+            shares.extend(member_shares)
+
+            economics.append(
+                {
+                    "member_id": member_id,
+                    "nr_of_shares": len(member_shares),
+                    "total_investment": sum(share["initial_value"] for share in member_shares),
+                    "current_value": sum(share["current_value"] for share in member_shares),
+                    "reinvested": 0,
+                    "account_balance": rng.randrange(0, 2 * settings.SHARE_PRICE, 50),
+                    "pay_out": rng.random() < 0.3,
+                    "disbursed": 0,
+                    "last_dividend_year": PAYMENT_YEAR - 1,
+                }
+            )
+
+        with bind.begin() as conn:
+            conn.execute(insert(Member), members)
+            conn.execute(insert(Share), shares)
+            conn.execute(insert(Economics), economics)
+
+
+@contextmanager
+def timed(results: Dict[str, float], name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
@@ -0,0 +1,45 @@
+"""
+Compare writing reinvested shares and payouts as ORM objects with the multi-row insert path of make_dividend.
+
+    python -m benchmarks.dividend_bulk_insert --members 2000 --reinvested-per-member 20
+"""
+
+import argparse
+
+from benchmarks.common import (
+    DIVIDEND_PER_SHARE,
+    PAYMENT_YEAR,
+    benchmark_engine,
+    reset_database,
+    seed_reinvesting_members,
+    timed,
+    use_database,
+)
+from solarpark.persistence import make_dividend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--shares-per-member", type=int, default=5)
+    parser.add_argument("--reinvested-per-member", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = benchmark_engine()
+    use_database(engine)
+
+    results = {}
+    for bulk_insert in (False, True):
+        reset_database(engine)
+        seed_reinvesting_members(engine, args.members, args.shares_per_member, args.reinvested_per_member)
+        with timed(results, "bulk insert" if bulk_insert else "orm objects"):
+            make_dividend(DIVIDEND_PER_SHARE, PAYMENT_YEAR, bulk_insert=bulk_insert)
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{args.members} members, {args.members * args.reinvested_per_member} reinvested shares")
+    for name, seconds in results.items():
+        print(f"{name:>12}: {seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
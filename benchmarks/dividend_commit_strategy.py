@@ -0,0 +1,60 @@
+"""
+Compare committing make_dividend once per member with one commit per batch and a savepoint per member.
+
+    python -m benchmarks.dividend_commit_strategy --members 5000 --batch-size 500
+
+Every commit is a flush to disk (an fsync on PostgreSQL). On SQLite the sqlite3 driver only opens a transaction
+before data changes, so a released savepoint commits on its own and the wall time difference shows on PostgreSQL.
+"""
+
+import argparse
+
+from sqlalchemy import event
+
+from benchmarks.common import (
+    DIVIDEND_PER_SHARE,
+    PAYMENT_YEAR,
+    benchmark_engine,
+    reset_database,
+    seed_reinvesting_members,
+    timed,
+    use_database,
+)
+from solarpark.persistence import make_dividend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--shares-per-member", type=int, default=5)
+    parser.add_argument("--reinvested-per-member", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = benchmark_engine()
+    use_database(engine)
+
+    results = {}
+    commits = {}
+    for commit_strategy in ("member", "batch"):
+        reset_database(engine)
+        seed_reinvesting_members(engine, args.members, args.shares_per_member, args.reinvested_per_member)
+
+        commits[commit_strategy] = 0
+
+        def count_commit(conn, commit_strategy=commit_strategy):  # pylint: disable=W0613
+            commits[commit_strategy] += 1
+
+        event.listen(engine, "commit", count_commit)
+        with timed(results, commit_strategy):
+            make_dividend(DIVIDEND_PER_SHARE, PAYMENT_YEAR, batch_size=args.batch_size, commit_strategy=commit_strategy)
+        event.remove(engine, "commit", count_commit)
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{args.members} members, batch size {args.batch_size}")
+    for name, seconds in results.items():
+        print(f"{name:>6}: {seconds:8.2f}s {commits[name]:8} commits")
+
+
+if __name__ == "__main__":
+    main()
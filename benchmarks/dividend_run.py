@@ -0,0 +1,91 @@
+"""
+Time a full dividend run against a synthetic membership, on SQLite and on PostgreSQL when a database URL is given.
+
+    python -m benchmarks.dividend_run --members 100000 --shares 1000000
+    python -m benchmarks.dividend_run --postgres-url postgresql://postgres@localhost/solarpark_benchmark
+
+Reports wall time, the number of statements sent to the database and the peak Python memory of the run. Memory is
+traced with tracemalloc, which slows the run down, pass --no-memory for the wall time alone. The PostgreSQL URL can
+also be given as BENCHMARK_POSTGRES_URL, its tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import tracemalloc
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import DIVIDEND_PER_SHARE, PAYMENT_YEAR, SQLITE_URL, reset_database, seed_population, timed
+from solarpark import persistence
+from solarpark.models.dividends import DividendEngine
+
+
+def run_dividend(bind, dividend_engine: DividendEngine, trace_memory: bool):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+        statements.append(executemany)
+
+    persistence.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    event.listen(bind, "before_cursor_execute", count_statement)
+    if trace_memory:
+        tracemalloc.start()
+
+    results = {}
+    with timed(results, "seconds"):
+        persistence.dividend_engines[dividend_engine](DIVIDEND_PER_SHARE, PAYMENT_YEAR)
+
+    if trace_memory:
+        results["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    event.remove(bind, "before_cursor_execute", count_statement)
+    results["statements"] = len(statements)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--shares", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=[dividend_engine.value for dividend_engine in DividendEngine],
+        default=["member", "set_based"],
+    )
+    parser.add_argument("--postgres-url", default=os.environ.get("BENCHMARK_POSTGRES_URL"))
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    databases = [create_engine(SQLITE_URL)]
+    if args.postgres_url:
+        databases.append(create_engine(args.postgres_url))
+    else:
+        print("no PostgreSQL URL given, only running on SQLite")
+
+    print(f"{args.members} members, {args.shares} shares")
+    for bind in databases:
+        try:
+            bind.connect().close()
+        except OperationalError as ex:
+            print(f"skipping {bind.url.render_as_string(hide_password=True)}, cannot connect: {ex}")
+            continue
+
+        for dividend_engine in args.engines:
+            reset_database(bind)
+            seed_population(bind, args.members, args.shares, seed=args.seed)
+            results = run_dividend(bind, DividendEngine(dividend_engine), trace_memory=not args.no_memory)
+
+            peak_memory = f"{results['peak_memory'] / 2**20:8.1f} MiB" if "peak_memory" in results else ""
+            print(
+                f"{bind.dialect.name:>10} {dividend_engine:>9}: {results['seconds']:8.2f}s "
+                f"{results['statements']:8} statements {peak_memory}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,23 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from solarpark.authentication import api_security
 from solarpark.logging import log_config
-from solarpark.persistence.database import Base, engine
+from solarpark.persistence.analytics import build_yearly_rollups_if_empty
+from solarpark.persistence.database import Base, SessionLocal, engine
+from solarpark.persistence.member_index import get_member_index
+from solarpark.persistence.search import create_trigram_indexes
 from solarpark.settings import settings
 from solarpark.setup import add_routes
 
 log_config.configure_logging()
 
 Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    create_trigram_indexes(connection)
+
+with SessionLocal() as db:
+    # Before any write adds to the yearly rollups of a database that has none yet
+    build_yearly_rollups_if_empty(db)
+    get_member_index(db)
 
 app = FastAPI(title="solarpark-service", description="Solar Park", root_path=settings.ROOT_PATH)
 
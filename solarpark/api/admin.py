@@ -11,7 +11,8 @@ from solarpark.models.members import MemberCreateRequest
 from solarpark.models.shares import ShareCreateRequestImport
 from solarpark.persistence.database import get_db
 from solarpark.persistence.economics import create_economics, get_economics_by_member
-from solarpark.persistence.members import count_all_members, create_member, get_all_members
+from solarpark.persistence.members import create_member, stream_member_ids
+from solarpark.persistence.sequences import compact_sequences
 from solarpark.persistence.shares import create_share_import, get_shares_by_member
 from solarpark.settings import settings
 
@@ -35,53 +36,39 @@ def parse_birth_date(birth_date: str):
 
 def create_economics_for_all_members(db: Session):
     """Create economics for existing members with shares"""
-    member_count = count_all_members(db)
-    offset = 0
-    limit = 20
-
-    while offset < member_count:
-        members = get_all_members(db, [], [offset, limit])
-
-        if not members and "data" not in members:
-            get_logger().error("error fetching members, aborting job")
-            break
-
-        for member in members["data"]:
-            # Iterate members and check if they have economics record already created
-            member_economics = get_economics_by_member(db=db, member_id=member.id)
-
-            if member_economics and "data" in member_economics and member_economics["total"] == 0:
-                # Get member shares and skip member if no shares found
-                member_shares = get_shares_by_member(db, member_id=member.id)
-
-                if member_shares and "data" in member_shares and member_shares["total"] > 0:
-                    # Create economics record for member
-                    nr_of_shares = member_shares["total"]
-                    total_investment = sum(share.initial_value for share in member_shares["data"])
-                    current_value = sum(share.current_value for share in member_shares["data"])
-
-                    created = create_economics(
-                        db,
-                        EconomicsCreateRequest(
-                            member_id=member.id,
-                            nr_of_shares=nr_of_shares,
-                            total_investment=total_investment,
-                            current_value=current_value,
-                            account_balance=0,
-                            reinvested=0,
-                            last_dividend_year=0,
-                            disbursed=0,
-                            pay_out=False,
-                        ),
-                    )
-
-                    if created:
-                        get_logger().info(f"created economics record successfully for member {member.id}")
-                    else:
-                        get_logger().error(f"error creating economics record for member {member.id}")
-
-        # Increment offset for next batch
-        offset += limit
+    for member in stream_member_ids(db):
+        # Iterate members and check if they have economics record already created
+        member_economics = get_economics_by_member(db=db, member_id=member.id)
+
+        if member_economics and "data" in member_economics and member_economics["total"] == 0:
+            # Get member shares and skip member if no shares found
+            member_shares = get_shares_by_member(db, member_id=member.id)
+
+            if member_shares and "data" in member_shares and member_shares["total"] > 0:
+                # Create economics record for member
+                nr_of_shares = member_shares["total"]
+                total_investment = sum(share.initial_value for share in member_shares["data"])
+                current_value = sum(share.current_value for share in member_shares["data"])
+
+                created = create_economics(
+                    db,
+                    EconomicsCreateRequest(
+                        member_id=member.id,
+                        nr_of_shares=nr_of_shares,
+                        total_investment=total_investment,
+                        current_value=current_value,
+                        account_balance=0,
+                        reinvested=0,
+                        last_dividend_year=0,
+                        disbursed=0,
+                        pay_out=False,
+                    ),
+                )
+
+                if created:
+                    get_logger().info(f"created economics record successfully for member {member.id}")
+                else:
+                    get_logger().error(f"error creating economics record for member {member.id}")
 
 
 @router.post("/import-members", summary="Import members from csv", status_code=202)
@@ -214,3 +201,12 @@ async def create_economics_endpoint(
     Can be called multiple times without issues.
     """
     background_tasks.add_task(create_economics_for_all_members, db)
+
+
+@router.post("/compact-sequences", summary="Renumber member and share ids after deletions")
+async def compact_sequences_endpoint(db: Session = Depends(get_db)):
+    """
+    Restarts the member and share id sequences after the highest remaining ids.
+    Deletions no longer do this themselves, call it once after a batch of deletions.
+    """
+    return {"data": compact_sequences(db)}
@@ -1,56 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from solarpark.models.analytics import AnalyticsYears
+from solarpark.persistence.analytics import (
+    claim_snapshot_refresh,
+    get_analytics_snapshot,
+    get_yearly_rollups,
+    refresh_analytics_snapshot_in_background,
+)
 from solarpark.persistence.database import get_db
-from solarpark.persistence.economics import get_total_account_balance, get_total_disbursed
-from solarpark.persistence.error_log import get_all_unresolved_errors
-from solarpark.persistence.leads import count_all_leads
-from solarpark.persistence.payments import get_year_payments
-from solarpark.persistence.shares import all_members_with_shares, count_all_shares
-from solarpark.settings import settings
 
 router = APIRouter()
 
 
 @router.get("/analytics", summary="Get analytical data")
-async def get_analytics_endpoint(db: Session = Depends(get_db)):
+async def get_analytics_endpoint(
+    fresh: bool = False,
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    db: Session = Depends(get_db),
+):
+    """
+    Analytics from the stored snapshot, which is refreshed in the background after writes. fresh=true recomputes it
+    from the tables.
+    """
     try:
-        all_members, all_member_organizations = all_members_with_shares(db)
-        all_shares_solarpark_excluded, all_solarpark_shares, reinvested_shares, org_more_than_one_share = (
-            count_all_shares(db)
-        )
-        total_account_balance = get_total_account_balance(db)
-        total_disbursed = get_total_disbursed(db)
-        year_payments = get_year_payments(db)
-        errors = get_all_unresolved_errors(db)
-        total_leads = count_all_leads(db)
-
-        return {
-            "errors": {"unresolved_errors": errors},
-            "members": {
-                "total_count": all_members,
-                "private_persons": all_members - all_member_organizations,
-                "organizations": all_member_organizations,
-            },
-            "shares": {
-                "total_count": all_shares_solarpark_excluded,
-                "total_count_solarpark_shares": all_solarpark_shares,
-                "reinvested_count": reinvested_shares,
-                "org_more_than_one_share": org_more_than_one_share,
-                "average_share_count_per_member": round(all_shares_solarpark_excluded / all_members),
-            },
-            "economics": {
-                "total_value": all_shares_solarpark_excluded * settings.SHARE_PRICE,
-                "reinvested_value": reinvested_shares * settings.SHARE_PRICE,
-                "total_account_balance": total_account_balance,
-            },
-            "payments": {
-                "total_disbursed": total_disbursed,
-                "year_payments": year_payments,
-            },
-            "leads": {
-                "total_leads": total_leads,
-            },
-        }
+        snapshot = get_analytics_snapshot(db, fresh=fresh)
+        if claim_snapshot_refresh(db, snapshot):
+            background_tasks.add_task(refresh_analytics_snapshot_in_background, db.get_bind())
+        return {**snapshot.data, "refreshed_at": snapshot.refreshed_at}
     except Exception as ex:
         raise HTTPException(status_code=400, detail="error getting analytics") from ex
+
+
+@router.get("/analytics/yearly", summary="Get analytical data per year")
+async def get_yearly_analytics_endpoint(
+    from_year: int | None = None,
+    to_year: int | None = None,
+    fresh: bool = False,
+    db: Session = Depends(get_db),
+) -> AnalyticsYears:
+    """
+    Shares bought and reinvested, dividend per share, payouts and member growth per year, from the yearly rollups.
+    fresh=true rebuilds them from the tables.
+    """
+    try:
+        return get_yearly_rollups(db, from_year, to_year, fresh=fresh)
+    except Exception as ex:
+        raise HTTPException(status_code=400, detail="error getting yearly analytics") from ex
@@ -7,9 +7,26 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from solarpark.api import parse_integrity_error_msg
-from solarpark.models.dividends import DividendCreateRequest, Dividends, DividendUpdateRequest, SingleDividend
-from solarpark.persistence import make_dividend
+from solarpark.models.dividend_runs import DividendRunCreateRequest, SingleDividendRunStatus
+from solarpark.models.dividends import (
+    DividendCreateRequest,
+    DividendEngine,
+    Dividends,
+    DividendSimulation,
+    DividendUpdateRequest,
+    SingleDividend,
+)
+from solarpark.persistence import dividend_engines, make_dividend_catch_up, make_dividend_parallel, simulate_dividend
 from solarpark.persistence.database import get_db
+from solarpark.persistence.dividend_runs import (
+    CATCH_UP_ENGINE,
+    DIVIDEND_RUN_COMPLETED,
+    claim_dividend_run,
+    create_dividend_run,
+    get_dividend_run,
+    get_dividend_run_partitions,
+    get_dividend_run_status,
+)
 from solarpark.persistence.dividends import (
     create_dividend,
     delete_dividend,
@@ -17,9 +34,10 @@ from solarpark.persistence.dividends import (
     get_dividend_by_id,
     get_dividend_by_list_ids,
     get_dividend_by_year,
+    get_dividends_by_year_range,
     update_dividend,
 )
-from solarpark.persistence.economics import get_all_economics
+from solarpark.settings import settings
 
 router = APIRouter()
 
@@ -119,10 +137,21 @@ async def delete_dividend_endpoint(dividend_id: int, db: Session = Depends(get_d
     raise HTTPException(status_code=400, detail="error deleting dividend")
 
 
+@router.get("/dividends/simulate/{payment_year}", summary="Simulate dividend without carrying it out")
+async def simulate_dividend_endpoint(payment_year: int, db: Session = Depends(get_db)) -> DividendSimulation:
+    dividend = get_dividend_by_year(db, payment_year)
+
+    if len(dividend["data"]) != 1:
+        raise HTTPException(status_code=400, detail="no dividend found or no unique dividend ")
+
+    return simulate_dividend(db, dividend["data"][0].dividend_per_share, payment_year)
+
+
 @router.put("/dividends/fulfill/{payment_year}", summary="Carry out dividend", status_code=202)
 async def make_dividend_endpoint(
     payment_year: int,
     is_historical_fulfillment: Optional[bool] = False,
+    engine: DividendEngine = DividendEngine.MEMBER,
     db: Session = Depends(get_db),
     background_tasks: BackgroundTasks = BackgroundTasks(),
 ):
@@ -145,14 +174,130 @@ async def make_dividend_endpoint(
 
         return {"message": "dividend done"}
 
-    economics = get_all_economics(db, [], [])
-    if economics and economics["total"]:
-        nr_of_economics = economics["total"]
-    else:
-        raise HTTPException(status_code=400, detail="economics not found")
+    dividend_run_request = DividendRunCreateRequest(
+        payment_year=payment_year,
+        engine=engine.value,
+        is_historical_fulfillment=bool(is_historical_fulfillment),
+    )
+    dividend_run = create_dividend_run(db, dividend_run_request)
+
+    if settings.DIVIDEND_PARALLELISM > 1:
+        background_tasks.add_task(
+            make_dividend_parallel,
+            amount,
+            payment_year,
+            engine,
+            is_historical_fulfillment=dividend_run.is_historical_fulfillment,
+            dividend_run_id=dividend_run.id,
+            parallelism=settings.DIVIDEND_PARALLELISM,
+        )
+        return {"message": "dividend started in the background", "dividend_run_id": dividend_run.id}
+
+    background_tasks.add_task(
+        dividend_engines[engine],
+        amount,
+        payment_year,
+        is_historical_fulfillment=dividend_run.is_historical_fulfillment,
+        dividend_run_id=dividend_run.id,
+    )
+
+    return {"message": "dividend started in the background", "dividend_run_id": dividend_run.id}
+
+
+@router.put(
+    "/dividends/catch-up/{from_year}/{to_year}",
+    summary="Carry out historical dividends for a range of years",
+    status_code=202,
+)
+async def make_dividend_catch_up_endpoint(
+    from_year: int,
+    to_year: int,
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+):
+    """
+    Historical fulfillment of every payment year from from_year to to_year in one pass over the members, instead of
+    one fulfill call per year.
+    """
+    if from_year > to_year:
+        raise HTTPException(status_code=400, detail="from_year must not be after to_year")
+
+    dividends = get_dividends_by_year_range(db, from_year, to_year)
+    amounts = {dividend.payment_year: dividend.dividend_per_share for dividend in dividends["data"]}
+    if dividends["total"] != len(amounts) or len(amounts) != to_year - from_year + 1:
+        raise HTTPException(status_code=400, detail="no dividend found or no unique dividend for every year")
+
+    dividend_run_request = DividendRunCreateRequest(
+        payment_year=to_year, engine=CATCH_UP_ENGINE, is_historical_fulfillment=True
+    )
+    dividend_run = create_dividend_run(db, dividend_run_request)
+    background_tasks.add_task(make_dividend_catch_up, amounts, dividend_run_id=dividend_run.id)
+
+    return {"message": "dividend catch-up started in the background", "dividend_run_id": dividend_run.id}
+
+
+@router.get("/dividends/runs/{dividend_run_id}", summary="Get dividend run status")
+async def get_dividend_run_status_endpoint(
+    dividend_run_id: int, db: Session = Depends(get_db)
+) -> SingleDividendRunStatus:
+    """
+    Progress of a running or finished dividend run as of its last checkpointed batch.
+    """
+    dividend_runs = get_dividend_run(db, dividend_run_id)
+    if len(dividend_runs["data"]) != 1:
+        raise HTTPException(status_code=404, detail="dividend run not found")
+
+    return {"data": get_dividend_run_status(db, dividend_runs["data"][0])}
+
+
+@router.put("/dividends/runs/{dividend_run_id}/resume", summary="Resume dividend run", status_code=202)
+async def resume_dividend_run_endpoint(
+    dividend_run_id: int,
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+):
+    """
+    Continue an interrupted dividend run after its last checkpointed economics row. A parallel run restarts its
+    unfinished partitions.
+    """
+    dividend_runs = get_dividend_run(db, dividend_run_id)
+    if len(dividend_runs["data"]) != 1:
+        raise HTTPException(status_code=404, detail="dividend run not found")
+
+    dividend_run = dividend_runs["data"][0]
+    if dividend_run.status == DIVIDEND_RUN_COMPLETED:
+        raise HTTPException(status_code=400, detail="dividend run already completed")
+    if dividend_run.parent_id is not None:
+        raise HTTPException(status_code=400, detail="dividend run is a partition, resume its parent run")
+    if dividend_run.engine == CATCH_UP_ENGINE:
+        raise HTTPException(status_code=400, detail="start the catch-up again, members already done are skipped")
+
+    dividend = get_dividend_by_year(db, dividend_run.payment_year)
+    if len(dividend["data"]) != 1:
+        raise HTTPException(status_code=400, detail="no dividend found or no unique dividend ")
+
+    if not claim_dividend_run(db, dividend_run):
+        raise HTTPException(status_code=409, detail="dividend run is still running")
+
+    partitions = get_dividend_run_partitions(db, dividend_run.id)
+    if partitions["total"]:
+        background_tasks.add_task(
+            make_dividend_parallel,
+            dividend["data"][0].dividend_per_share,
+            dividend_run.payment_year,
+            DividendEngine(dividend_run.engine),
+            is_historical_fulfillment=dividend_run.is_historical_fulfillment,
+            dividend_run_id=dividend_run.id,
+            parallelism=partitions["total"],
+        )
+        return {"message": "dividend resumed in the background", "dividend_run_id": dividend_run.id}
 
     background_tasks.add_task(
-        make_dividend, amount, payment_year, nr_of_economics, is_historical_fulfillment=is_historical_fulfillment
+        dividend_engines[DividendEngine(dividend_run.engine)],
+        dividend["data"][0].dividend_per_share,
+        dividend_run.payment_year,
+        is_historical_fulfillment=dividend_run.is_historical_fulfillment,
+        dividend_run_id=dividend_run.id,
     )
 
-    return {"message": "dividend started in the background"}
+    return {"message": "dividend resumed in the background", "dividend_run_id": dividend_run.id}
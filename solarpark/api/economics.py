@@ -8,6 +8,7 @@ from structlog import get_logger
 
 from solarpark.api import parse_integrity_error_msg
 from solarpark.models.economics import Economics, EconomicsCreateRequest, EconomicsUpdateRequest, SingleEconomics
+from solarpark.persistence.counts import TotalCount
 from solarpark.persistence.database import get_db
 from solarpark.persistence.economics import (
     create_economics,
@@ -16,8 +17,10 @@ from solarpark.persistence.economics import (
     get_economics,
     get_economics_by_list_ids,
     get_economics_by_member,
+    get_economics_by_member_list,
     update_economics,
 )
+from solarpark.persistence.lookups import MemberIdsError
 
 router = APIRouter()
 
@@ -82,6 +85,8 @@ async def get_all_economics_endpoint(
     range: str | None = None,
     sort: str | None = None,
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalCount = TotalCount.EXACT,
     db: Session = Depends(get_db),
 ) -> Economics:
     try:
@@ -101,13 +106,19 @@ async def get_all_economics_endpoint(
                 return get_economics_by_list_ids(db, filter_obj["id"])
             return get_economics(db, filter_obj["id"])
         if filter_obj and "member_id" in filter_obj:
+            if isinstance(filter_obj["member_id"], list):
+                return get_economics_by_member_list(db, filter_obj["member_id"])
             if isinstance(filter_obj["member_id"], int):
                 return get_economics_by_member(db, filter_obj["member_id"])
             return Economics(data=[], total=0)
 
-        return get_all_economics(db, sort=sort_obj, range=range_obj)
+        return get_all_economics(db, sort=sort_obj, range=range_obj, cursor=cursor, total=total)
+    except MemberIdsError as ex:
+        raise HTTPException(status_code=422, detail=str(ex)) from ex
     except json.JSONDecodeError as ex:
         raise HTTPException(status_code=400, detail="error decoding filter, sort or range parameters") from ex
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
     except Exception as ex:
         get_logger().error(ex)
         raise HTTPException(status_code=400, detail="error retrieving economics") from ex
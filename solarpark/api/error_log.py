@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from solarpark.api import parse_integrity_error_msg
 from solarpark.models.error_log import ErrorLog, ErrorLogCreateRequest, ErrorLogs, ErrorLogUpdateRequest, SingleErrorLog
+from solarpark.persistence.counts import TotalCount
 from solarpark.persistence.database import get_db
 from solarpark.persistence.error_log import (
     create_error,
@@ -36,6 +37,8 @@ async def get_errors_endpoint(
     range: str | None = None,
     sort: str | None = None,
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalCount = TotalCount.EXACT,
     db: Session = Depends(get_db),
 ) -> ErrorLogs:
     try:
@@ -55,9 +58,11 @@ async def get_errors_endpoint(
                 return get_error_by_list_ids(db, filter_obj["id"])
             return get_error(db, filter_obj["id"])
 
-        return get_all_errors(db, sort=sort_obj, range=range_obj)
+        return get_all_errors(db, sort=sort_obj, range=range_obj, cursor=cursor, total=total)
     except json.JSONDecodeError as ex:
         raise HTTPException(status_code=400, detail="error decoding filter, sort or range parameters") from ex
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
 
 
 @router.put("/errors/{error_id}", summary="Update error")
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from solarpark.api import parse_integrity_error_msg
 from solarpark.models.leads import LeadCreateRequest, Leads, LeadUpdateRequest, SingleLead
+from solarpark.persistence.counts import TotalCount
 from solarpark.persistence.database import get_db
 from solarpark.persistence.leads import (
     approve_lead,
@@ -38,6 +39,8 @@ async def get_leads_endpoint(
     range: str | None = None,
     sort: str | None = None,
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalCount = TotalCount.EXACT,
     db: Session = Depends(get_db),
 ) -> Leads:
     try:
@@ -58,9 +61,11 @@ async def get_leads_endpoint(
             return get_lead(db, filter_obj["id"])
         if filter_obj and "q" in filter_obj:
             return find_lead(db, filter_obj["q"])
-        return get_all_leads(db, sort=sort_obj, range=range_obj)
+        return get_all_leads(db, sort=sort_obj, range=range_obj, cursor=cursor, total=total)
     except json.JSONDecodeError as ex:
         raise HTTPException(status_code=400, detail="error decoding filter, sort or range parameters") from ex
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
 
 
 @router.put("/leads/{lead_id}", summary="Update lead")
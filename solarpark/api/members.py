@@ -7,15 +7,25 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from solarpark.api import parse_integrity_error_msg
-from solarpark.models.members import MemberCreateRequest, Members, MemberUpdateRequest, SingleMember
+from solarpark.models.members import (
+    MemberCreateRequest,
+    Members,
+    MemberSuggestions,
+    MemberUpdateRequest,
+    SingleMember,
+    SingleMemberDetail,
+)
 from solarpark.persistence import delete_all_member_data
+from solarpark.persistence.counts import TotalCount
 from solarpark.persistence.database import get_db
+from solarpark.persistence.member_index import autocomplete_members
 from solarpark.persistence.members import (
     create_member,
     find_member,
     get_all_members,
     get_member,
     get_member_by_list_ids,
+    get_member_detail,
     update_member,
 )
 
@@ -37,11 +47,31 @@ async def search_members_endpoint(term: str, db: Session = Depends(get_db)):
     return find_member(db, term)
 
 
+@router.get("/members/autocomplete/{prefix}", summary="Suggest members by the start of their number, name or email")
+async def autocomplete_members_endpoint(
+    prefix: str, limit: int | None = None, db: Session = Depends(get_db)
+) -> MemberSuggestions:
+    return autocomplete_members(db, prefix, limit)
+
+
+# Declared after the search and autocomplete routes, which would otherwise match it for the term "detail"
+@router.get("/members/{member_id}/detail", summary="Get member with economics, shares and payments")
+async def get_member_detail_endpoint(member_id: int, db: Session = Depends(get_db)) -> SingleMemberDetail:
+    member = get_member_detail(db, member_id)
+
+    if member is None:
+        raise HTTPException(status_code=404, detail="member not found")
+
+    return {"data": member}
+
+
 @router.get("/members", summary="Get all members")
 async def get_members_endpoint(
     range: str | None = None,
     sort: str | None = None,
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalCount = TotalCount.EXACT,
     db: Session = Depends(get_db),
 ) -> Members:
     try:
@@ -63,9 +93,11 @@ async def get_members_endpoint(
         if filter_obj and "q" in filter_obj:
             return find_member(db, filter_obj["q"])
 
-        return get_all_members(db, sort=sort_obj, range=range_obj)
+        return get_all_members(db, sort=sort_obj, range=range_obj, cursor=cursor, total=total)
     except json.JSONDecodeError as ex:
         raise HTTPException(status_code=400, detail="error decoding filter, sort or range parameters") from ex
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
 
 
 @router.put("/members/{member_id}", summary="Update member")
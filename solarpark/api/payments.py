@@ -8,7 +8,9 @@ from sqlalchemy.orm import Session
 
 from solarpark.api import parse_integrity_error_msg
 from solarpark.models.payments import PaymentCreateRequest, Payments, PaymentUpdateRequest, SinglePayment
+from solarpark.persistence.counts import TotalCount
 from solarpark.persistence.database import get_db
+from solarpark.persistence.lookups import MemberIdsError
 from solarpark.persistence.payments import (
     create_payment,
     delete_payment,
@@ -16,6 +18,7 @@ from solarpark.persistence.payments import (
     get_payment_by_list_ids,
     get_payment_by_member_id,
     get_payment_id,
+    get_payments_by_member_list,
     update_payment_id,
 )
 
@@ -60,6 +63,8 @@ async def get_payments_endpoint(
     range: str | None = None,
     sort: str | None = None,
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalCount = TotalCount.EXACT,
     db: Session = Depends(get_db),
 ) -> Payments:
     try:
@@ -79,9 +84,13 @@ async def get_payments_endpoint(
                 return get_payment_by_list_ids(db, filter_obj["id"])
             return get_payment_id(db, filter_obj["id"])
         if filter_obj and "member_id" in filter_obj:
+            if isinstance(filter_obj["member_id"], list):
+                return get_payments_by_member_list(db, filter_obj["member_id"])
             return get_payment_by_member_id(db, filter_obj["member_id"])
-        return get_all_payments(db, sort=sort_obj, range=range_obj)
+        return get_all_payments(db, sort=sort_obj, range=range_obj, cursor=cursor, total=total)
 
+    except MemberIdsError as ex:
+        raise HTTPException(status_code=422, detail=str(ex)) from ex
     except Exception as ex:
         raise HTTPException(status_code=400, detail=f"error:{ex}") from ex
 
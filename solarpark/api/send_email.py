@@ -12,7 +12,7 @@ from solarpark.models.error_log import ErrorLogCreateRequest
 from solarpark.persistence.database import SessionLocal, get_db
 from solarpark.persistence.economics import get_economics_by_member
 from solarpark.persistence.error_log import create_error
-from solarpark.persistence.members import get_all_member_ids_and_emails, get_member
+from solarpark.persistence.members import get_member, stream_member_ids_and_emails
 from solarpark.persistence.shares import get_shares_by_member
 from solarpark.services import loopia_client
 from solarpark.services.loopia import LoopiaEmailClient
@@ -105,7 +105,7 @@ def send_bulk_summary_and_certificate_with_loopia(
     db: Session = SessionLocal()
     try:
         rate_limit_seconds = 20
-        members = get_all_member_ids_and_emails(db)
+        members = stream_member_ids_and_emails(db)
         for member_id, email in members:
             if email is None or email == "":
                 continue
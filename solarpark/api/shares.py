@@ -7,8 +7,10 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from solarpark.api import parse_integrity_error_msg
-from solarpark.models.shares import ShareCreateRequest, Shares, ShareUpdateRequest, SingleShare
+from solarpark.models.shares import ShareCreateRequest, Shares, ShareTransferRequest, ShareUpdateRequest, SingleShare
+from solarpark.persistence.counts import TotalCount
 from solarpark.persistence.database import get_db
+from solarpark.persistence.lookups import MemberIdsError
 from solarpark.persistence.shares import (
     create_share,
     delete_share,
@@ -16,6 +18,8 @@ from solarpark.persistence.shares import (
     get_share,
     get_share_by_list_ids,
     get_shares_by_member,
+    get_shares_by_member_list,
+    transfer_shares,
     update_share,
 )
 
@@ -36,6 +40,8 @@ async def get_shares_endpoint(
     range: str | None = None,
     sort: str | None = None,
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalCount = TotalCount.EXACT,
     db: Session = Depends(get_db),
 ) -> Shares:
     try:
@@ -55,13 +61,19 @@ async def get_shares_endpoint(
                 return get_share_by_list_ids(db, filter_obj["id"])
             return get_share(db, filter_obj["id"])
         if filter_obj and "member_id" in filter_obj:
+            if isinstance(filter_obj["member_id"], list):
+                return get_shares_by_member_list(db, filter_obj["member_id"])
             return get_shares_by_member(db, filter_obj["member_id"])
         if filter_obj and "q" in filter_obj:
             return get_share(db, filter_obj["q"])
 
-        return get_all_shares(db, sort=sort_obj, range=range_obj)
+        return get_all_shares(db, sort=sort_obj, range=range_obj, cursor=cursor, total=total)
+    except MemberIdsError as ex:
+        raise HTTPException(status_code=422, detail=str(ex)) from ex
     except json.JSONDecodeError as ex:
         raise HTTPException(status_code=400, detail="error decoding filter, sort or range parameters") from ex
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
 
 
 @router.post("/shares", summary="Create share")
@@ -83,13 +95,29 @@ async def create_share_endpoint(share_request: ShareCreateRequest, db: Session =
     raise HTTPException(status_code=400, detail="error creating share")
 
 
+@router.post("/shares/transfer", summary="Transfer shares to another member")
+async def transfer_shares_endpoint(transfer_request: ShareTransferRequest, db: Session = Depends(get_db)) -> Shares:
+    try:
+        return transfer_shares(db, transfer_request)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
+    except IntegrityError as ex:
+        if "violates foreign key" in str(ex):
+            raise HTTPException(
+                status_code=400,
+                detail=parse_integrity_error_msg("Key (.*?) not present", str(ex)),
+            ) from ex
+        raise HTTPException(status_code=400, detail="error transferring shares") from ex
+
+
 @router.put("/shares/{share_id}", summary="Update share")
 async def update_share_endpoint(
     share_id: int, share_request: ShareUpdateRequest, db: Session = Depends(get_db)
 ) -> SingleShare:
     try:
         updated_share = update_share(db, share_id, share_request)
-        return {"data": updated_share}
+        if updated_share:
+            return {"data": updated_share}
     except IntegrityError as ex:
         if "UniqueViolation" in str(ex):
             raise HTTPException(
@@ -102,6 +130,7 @@ async def update_share_endpoint(
                 detail=parse_integrity_error_msg("Key (.*?) not present", str(ex)),
             ) from ex
         raise HTTPException(status_code=400, detail="error updating share") from ex
+    raise HTTPException(status_code=400, detail="error updating share")
 
 
 @router.delete("/shares/{share_id}", summary="Delete share")
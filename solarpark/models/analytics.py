@@ -0,0 +1,23 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class AnalyticsYear(BaseModel):
+    year: int
+    shares_bought: int
+    reinvested_shares: int
+    dividend_per_share: Optional[float] = None
+    nr_of_payouts: int
+    payout_amount: float
+    new_members: int
+    total_members: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AnalyticsYears(BaseModel):
+    data: List[AnalyticsYear]
+    total: int
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class DividendRun(BaseModel):
+    id: int
+    parent_id: Optional[int] = None
+    payment_year: int
+    engine: str
+    is_historical_fulfillment: bool
+    status: str
+    last_economics_id: int
+    end_economics_id: Optional[int] = None
+    total_economics: Optional[int] = None
+    members_processed: int
+    members_skipped: int
+    members_failed: int
+    shares_created: int
+    payouts_created: int
+    heartbeat_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    members_done_at_start: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SingleDividendRun(BaseModel):
+    data: DividendRun
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DividendRuns(BaseModel):
+    data: List[DividendRun]
+    total: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DividendRunStatus(DividendRun):
+    elapsed_seconds: float
+    members_per_second: float
+    eta_seconds: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SingleDividendRunStatus(BaseModel):
+    data: DividendRunStatus
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DividendRunCreateRequest(BaseModel):
+    payment_year: int
+    engine: str
+    is_historical_fulfillment: bool = False
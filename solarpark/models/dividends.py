@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
@@ -38,3 +39,36 @@ class DividendUpdateRequest(BaseModel):
     dividend_per_share: int
     payment_year: int
     completed: bool
+
+
+class DividendSimulationMember(BaseModel):
+    member_id: int
+    dividend: float
+    payout: Optional[float] = None
+    nr_of_shares_to_reinvest: int
+    nr_of_shares: int
+    current_value: float
+    account_balance: float
+
+
+class DividendSimulation(BaseModel):
+    payment_year: int
+    dividend_per_share: float
+    total_dividend: float
+    total_payout: float
+    nr_of_payouts: int
+    nr_of_reinvested_shares: int
+    total_current_value: float
+    members_already_done: List[int]
+    members_without_shares: List[int]
+    members: List[DividendSimulationMember]
+
+
+class DividendEngine(str, Enum):
+    MEMBER = "member"
+    SET_BASED = "set_based"
+
+
+class DividendCommitStrategy(str, Enum):
+    MEMBER = "member"
+    BATCH = "batch"
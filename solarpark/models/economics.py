@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -29,6 +29,8 @@ class SingleEconomics(BaseModel):
 class Economics(BaseModel):
     data: List[EconomicsMember]
     total: int
+    next_cursor: Optional[str] = None
+    by_member: Optional[Dict[int, List[int]]] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -39,5 +39,6 @@ class ErrorLogUpdateRequest(BaseModel):
 class ErrorLogs(BaseModel):
     data: List[ErrorLog]
     total: int
+    next_cursor: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
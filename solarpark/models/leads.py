@@ -35,6 +35,7 @@ class SingleLead(BaseModel):
 class Leads(BaseModel):
     data: List[Lead]
     total: int
+    next_cursor: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
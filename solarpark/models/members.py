@@ -3,6 +3,8 @@ from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
+from solarpark.models.economics import EconomicsMember
+from solarpark.models.payments import Payment
 from solarpark.models.shares import Share
 
 
@@ -32,6 +34,19 @@ class MemberWithShares(Member):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MemberDetail(MemberWithShares):
+    economics: List[EconomicsMember]
+    payments: List[Payment]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SingleMemberDetail(BaseModel):
+    data: MemberDetail
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class SingleMember(BaseModel):
     data: Member
 
@@ -71,5 +86,19 @@ class MemberUpdateRequest(BaseModel):
 class Members(BaseModel):
     data: List[Member]
     total: int
+    next_cursor: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class MemberSuggestion(BaseModel):
+    id: int
+    firstname: Optional[str] = None
+    lastname: Optional[str] = None
+    org_name: Optional[str] = None
+    email: str
+
+
+class MemberSuggestions(BaseModel):
+    data: List[MemberSuggestion]
+    total: int
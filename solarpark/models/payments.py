@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -22,6 +22,8 @@ class SinglePayment(BaseModel):
 class Payments(BaseModel):
     data: List[Payment]
     total: int
+    next_cursor: Optional[str] = None
+    by_member: Optional[Dict[int, List[int]]] = None
 
     model_config = ConfigDict(from_attributes=True)
 
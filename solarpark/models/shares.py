@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -42,6 +42,8 @@ class ShareCreateRequestImport(BaseModel):
 class Shares(BaseModel):
     data: List[Share]
     total: int
+    next_cursor: Optional[str] = None
+    by_member: Optional[Dict[int, List[int]]] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -54,6 +56,11 @@ class ShareUpdateRequest(BaseModel):
     from_internal_account: bool
 
 
+class ShareTransferRequest(BaseModel):
+    share_ids: List[int]
+    member_id: int
+
+
 class ShareCreateRequest(BaseModel):
     comment: Optional[str] = None
     purchased_at: datetime
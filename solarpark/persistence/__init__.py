@@ -1,175 +1,836 @@
 # pylint: disable=R0914,R0915,W0127, R0912,C0301
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import text
+from sqlalchemy import case, delete, func, insert, update
 from sqlalchemy.orm import Session
 from structlog import get_logger
 
-from solarpark.models.dividends import DividendUpdateRequest
+from solarpark.models.dividend_runs import DividendRunCreateRequest
+from solarpark.models.dividends import DividendCommitStrategy, DividendEngine, DividendUpdateRequest
 from solarpark.models.economics import EconomicsUpdateRequest
 from solarpark.models.error_log import ErrorLogCreateRequest
-from solarpark.models.shares import ShareUpdateRequest
+from solarpark.persistence.analytics_deltas import (
+    apply_yearly_deltas,
+    member_deltas,
+    payment_deltas,
+    set_yearly_dividend,
+    share_deltas,
+)
 from solarpark.persistence.database import SessionLocal
+from solarpark.persistence.dividend_runs import (
+    CATCH_UP_ENGINE,
+    DIVIDEND_RUN_COMPLETED,
+    DIVIDEND_RUN_FAILED,
+    checkpoint_dividend_run,
+    create_dividend_run,
+    create_dividend_run_partitions,
+    get_dividend_run,
+    get_dividend_run_partitions,
+    heartbeat_dividend_run,
+    set_dividend_run_status,
+)
 from solarpark.persistence.economics import get_all_economics_dividend
-from solarpark.persistence.error_log import create_error
+from solarpark.persistence.error_log import add_error, create_error
+from solarpark.persistence.member_index import unindex_member
+from solarpark.persistence.models.dividend_runs import DividendRun
 from solarpark.persistence.models.dividends import Dividend
 from solarpark.persistence.models.economics import Economics
 from solarpark.persistence.models.members import Member
 from solarpark.persistence.models.payments import Payment
 from solarpark.persistence.models.shares import Share
-from solarpark.persistence.shares import get_shares_by_member
+from solarpark.persistence.shares import get_shares_grouped_by_member
 from solarpark.settings import settings
 
 
-def make_dividend(amount: float, payment_year: int, nr_of_economics: int, is_historical_fulfillment: bool = False):
+def get_or_create_dividend_run(
+    db: Session,
+    payment_year: int,
+    engine: DividendEngine,
+    is_historical_fulfillment: bool,
+    dividend_run_id: Optional[int],
+) -> DividendRun:
+    if dividend_run_id is not None:
+        dividend_run = get_dividend_run(db, dividend_run_id)["data"][0]
+        heartbeat_dividend_run(db, dividend_run)
+        return dividend_run
+
+    dividend_run_request = DividendRunCreateRequest(
+        payment_year=payment_year,
+        engine=engine.value,
+        is_historical_fulfillment=is_historical_fulfillment,
+    )
+    return create_dividend_run(db, dividend_run_request)
+
+
+def complete_dividend_run(db: Session, dividend_run: DividendRun, amount: float, payment_year: int):
+    # A partition only covers part of the economics, the parallel run completes the dividend once all are done
+    if dividend_run.parent_id is not None:
+        set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_COMPLETED)
+        get_logger().info(f"fulfilled dividend {payment_year} for partition {dividend_run.id} successfully")
+        return
+
+    dividend_update = DividendUpdateRequest(dividend_per_share=amount, payment_year=payment_year, completed=True)
+    if db.query(Dividend).filter(Dividend.payment_year == payment_year).update(dividend_update.model_dump()):
+        set_yearly_dividend(db, payment_year, amount)
+    set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_COMPLETED)
+    get_logger().info(f"fulfilled dividend {payment_year} successfully")
+
+
+def make_dividend(
+    amount: float,
+    payment_year: int,
+    is_historical_fulfillment: bool = False,
+    dividend_run_id: Optional[int] = None,
+    bulk_insert: bool = settings.DIVIDEND_BULK_INSERT,
+    batch_size: int = settings.ECONOMICS_BACKGROUND_BATCH,
+    commit_strategy: str = settings.DIVIDEND_COMMIT_STRATEGY,
+):
+    """
+    Carry out dividend member by member. Progress is checkpointed on the dividend run after every batch, passing
+    dividend_run_id continues that run after its last processed economics row. With bulk_insert the member's
+    payout and reinvested shares are written as multi-row inserts instead of one ORM object per row. The batch
+    commit strategy commits once per batch and wraps each member in a savepoint, the member strategy commits every
+    member. A batch is only atomic on PostgreSQL: pysqlite does not begin a transaction before the savepoint, so on
+    SQLite each member is committed when its savepoint is released and a failed batch commit only loses the batch's
+    share write-down and rollup update. The members' errors are written with the batch's checkpoint, after its
+    commit, so a failed batch commit does not roll them back.
+    """
+    batch_commit = DividendCommitStrategy(commit_strategy) == DividendCommitStrategy.BATCH
     db: Session = SessionLocal()
+    # Updates are synchronized into the loaded objects, keep them instead of reloading after every member commit
+    db.expire_on_commit = False
+    dividend_run = get_or_create_dividend_run(
+        db, payment_year, DividendEngine.MEMBER, is_historical_fulfillment, dividend_run_id
+    )
     try:
-        batch_size = settings.ECONOMICS_BACKGROUND_BATCH
-        for i in range(0, nr_of_economics, batch_size):
-
-            members_economics_batch = get_all_economics_dividend(db, range=[i, batch_size])
-            if not members_economics_batch or not members_economics_batch["data"]:
-                error_request = ErrorLogCreateRequest(
-                    comment=f"Error: no dividends done for members in batch {i}, {members_economics_batch['data']}, {members_economics_batch}",
-                    resolved=False,
-                )
-                create_error(db, error_request)
-
-                continue
+        last_economics_id = dividend_run.last_economics_id
+        while True:
+            members_economics_batch = get_all_economics_dividend(
+                db, last_economics_id, batch_size, dividend_run.end_economics_id
+            )
+            if not members_economics_batch["data"]:
+                break
+
+            last_economics_id = members_economics_batch["data"][-1].id
+            members_processed = 0
+            members_skipped = 0
+            members_failed = 0
+            shares_created = 0
+            payouts_created = 0
+            written_down_share_ids = []
+            created_shares = []
+            created_payments = []
+            member_errors = []
+            shares_by_member = get_shares_grouped_by_member(
+                db,
+                [
+                    member_economics.member_id
+                    for member_economics in members_economics_batch["data"]
+                    if member_economics.last_dividend_year < payment_year
+                ],
+            )
 
             for member_economics in members_economics_batch["data"]:
                 if member_economics.last_dividend_year >= payment_year:
                     get_logger().info(
                         f"Skipping member {member_economics.member_id}, dividend already done for year {payment_year}"
                     )
+                    members_skipped += 1
 
                     continue
 
-                shares = get_shares_by_member(db, member_economics.member_id)
+                shares = shares_by_member[member_economics.member_id]
                 if not shares["total"] or not shares["data"]:
                     error_request = ErrorLogCreateRequest(
                         member_id=member_economics.member_id,
                         comment="Error: no shares found, no dividends done",
                         resolved=False,
                     )
-                    create_error(db, error_request)
+                    member_errors.append(error_request)
+                    members_failed += 1
 
                     continue
 
-                current_nr_of_shares = shares["total"]
-                current_disbursed = member_economics.disbursed
-                current_reinvested = member_economics.reinvested
-                current_total_investment = sum(share.initial_value for share in shares["data"])
+                member_transaction = db.begin_nested() if batch_commit else None
+                try:
+                    current_total_investment = sum(share.initial_value for share in shares["data"])
+                    nr_of_eligible_shares = sum(1 for share in shares["data"] if share.purchased_at.year < payment_year)
+                    eligible_share_ids = [
+                        share.id for share in shares["data"] if share.purchased_at < datetime(payment_year, 1, 1)
+                    ]
+                    new_total_current_value_of_share = written_down_current_value(shares["data"], payment_year, amount)
+
+                    economics_update, payout, nr_of_shares_to_reinvest = calculate_member_dividend(
+                        member_economics,
+                        nr_of_shares=shares["total"],
+                        total_investment=current_total_investment,
+                        nr_of_eligible_shares=nr_of_eligible_shares,
+                        current_value=new_total_current_value_of_share,
+                        amount=amount,
+                        payment_year=payment_year,
+                    )
 
-                new_dividend = amount * sum(1 for share in shares["data"] if share.purchased_at.year < payment_year)
-                new_account_balance = new_dividend + member_economics.account_balance
+                    payments = [payment_row(member_economics.member_id, payout)] if payout is not None else []
+                    reinvested_shares = (
+                        reinvested_share_rows(member_economics.member_id, nr_of_shares_to_reinvest)
+                        if not is_historical_fulfillment
+                        else []
+                    )
 
-                new_disbursed = current_disbursed
-                if member_economics.pay_out:
-                    new_disbursed = current_disbursed + new_account_balance
+                    db.query(Economics).filter(Economics.id == member_economics.id).update(
+                        economics_update.model_dump()
+                    )
+                    # Committing per member, the write-down and rollups have to be part of the member's own commit
+                    if member_transaction is None:
+                        write_down_shares(db, eligible_share_ids, amount)
+                        apply_yearly_deltas(db, share_deltas(reinvested_shares), payment_deltas(payments))
+
+                    if bulk_insert:
+                        insert_dividend_rows(db, reinvested_shares, payments)
+                    else:
+                        db.add_all([Payment(**payment) for payment in payments])
+                        db.add_all([Share(**share) for share in reinvested_shares])
+
+                    if member_transaction is not None:
+                        member_transaction.commit()
+                    else:
+                        db.commit()
+                    members_processed += 1
+                    written_down_share_ids.extend(eligible_share_ids)
+                    created_shares.extend(reinvested_shares)
+                    created_payments.extend(payments)
+                    shares_created += len(reinvested_shares)
+                    payouts_created += len(payments)
+                except Exception as ex:
+                    if member_transaction is not None:
+                        member_transaction.rollback()
+                    else:
+                        db.rollback()
+                    get_logger().error(
+                        f"failed to commit dividend for member {member_economics.member_id}, details: {ex}"
+                    )
+                    error_request = ErrorLogCreateRequest(
+                        member_id=member_economics.member_id,
+                        comment=f"Error: no dividend done, details: {ex}",
+                        resolved=False,
+                    )
+                    member_errors.append(error_request)
+                    members_failed += 1
 
-                    payment = Payment(
+            if batch_commit:
+                try:
+                    # One write-down for the batch, of the shares the members that succeeded held before dividend,
+                    # and one rollup update for their new shares and payouts, with the batch's commit
+                    write_down_shares(db, written_down_share_ids, amount)
+                    apply_yearly_deltas(db, share_deltas(created_shares), payment_deltas(created_payments))
+                    db.commit()
+                except Exception as ex:
+                    db.rollback()
+                    get_logger().error(
+                        f"failed to commit dividend for economics up to {last_economics_id}, details: {ex}"
+                    )
+                    error_request = ErrorLogCreateRequest(
+                        comment=f"Error: no dividend done for economics batch ending at {last_economics_id}, details: {ex}",
+                        resolved=False,
+                    )
+                    create_error(db, error_request)
+                    members_failed += members_processed
+                    members_processed = 0
+                    shares_created = 0
+                    payouts_created = 0
+
+            # Committed with the checkpoint, a failed batch commit must not take the members' errors with it
+            for error_request in member_errors:
+                add_error(db, error_request)
+            checkpoint_dividend_run(
+                db,
+                dividend_run,
+                last_economics_id,
+                members_processed,
+                members_skipped,
+                members_failed,
+                shares_created,
+                payouts_created,
+            )
+
+        complete_dividend_run(db, dividend_run, amount, payment_year)
+
+    except Exception:
+        db.rollback()
+        set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_FAILED)
+        raise
+
+    finally:
+        db.close()
+
+
+def calculate_member_dividend(
+    member_economics: Economics,
+    nr_of_shares: int,
+    total_investment: float,
+    nr_of_eligible_shares: int,
+    current_value: float,
+    amount: float,
+    payment_year: int,
+) -> Tuple[EconomicsUpdateRequest, Optional[float], int]:
+    """
+    Calculate a member's economics after dividend. current_value is the member's total share value after the
+    eligible shares have been written down. Returns the economics update, the payout (None if the member
+    reinvests) and the number of shares to reinvest.
+    """
+    new_account_balance = amount * nr_of_eligible_shares + member_economics.account_balance
+
+    payout = None
+    new_disbursed = member_economics.disbursed
+    if member_economics.pay_out:
+        new_disbursed = member_economics.disbursed + new_account_balance
+        payout = new_account_balance
+        new_account_balance = 0
+
+    nr_of_shares_to_reinvest = int(new_account_balance // settings.SHARE_PRICE)
+    reinvested_value = nr_of_shares_to_reinvest * settings.SHARE_PRICE
+
+    economics_update = EconomicsUpdateRequest(
+        nr_of_shares=nr_of_shares + nr_of_shares_to_reinvest,
+        total_investment=total_investment + reinvested_value,
+        current_value=current_value + reinvested_value,
+        reinvested=member_economics.reinvested + reinvested_value,
+        account_balance=new_account_balance - reinvested_value,
+        pay_out=member_economics.pay_out,
+        disbursed=new_disbursed,
+        last_dividend_year=payment_year,
+        issued_dividend=datetime.now(timezone.utc),
+    )
+
+    return economics_update, payout, nr_of_shares_to_reinvest
+
+
+def payment_row(member_id: int, payout: float) -> Dict:
+    return {
+        "member_id": member_id,
+        "year": datetime.now().year,
+        "amount": payout,
+        "paid_out": False,
+    }
+
+
+def reinvested_share_rows(member_id: int, nr_of_shares_to_reinvest: int) -> List[Dict]:
+    return [
+        {
+            "member_id": member_id,
+            "initial_value": settings.SHARE_PRICE,
+            "current_value": settings.SHARE_PRICE,
+            "purchased_at": date((datetime.now().year - 1), 12, 31),
+            "from_internal_account": True,
+        }
+        for _ in range(nr_of_shares_to_reinvest)
+    ]
+
+
+def insert_dividend_rows(db: Session, reinvested_shares: List[Dict], payments: List[Dict]):
+    """
+    Write reinvested shares and payouts with one multi-row INSERT per table, without loading them as ORM objects.
+    """
+    if payments:
+        db.execute(insert(Payment), payments)
+    if reinvested_shares:
+        db.execute(insert(Share), reinvested_shares)
+
+
+def written_down_share_value(amount: float):
+    return case((Share.current_value - amount > 0, Share.current_value - amount), else_=0)
+
+
+def get_share_totals_for_dividend(db: Session, payment_year: int, amount: float):
+    """
+    Share totals per member as used by the dividend calculation: number of shares, total investment, number of
+    shares bought before the payment year and the total current value after those shares are written down.
+    """
+    eligible_before = datetime(payment_year, 1, 1)
+    return db.query(
+        Share.member_id.label("member_id"),
+        func.count(Share.id).label("nr_of_shares"),
+        func.sum(Share.initial_value).label("total_investment"),
+        func.sum(case((Share.purchased_at < eligible_before, 1), else_=0)).label("nr_of_eligible_shares"),
+        func.sum(
+            case((Share.purchased_at < eligible_before, written_down_share_value(amount)), else_=Share.current_value)
+        ).label("current_value"),
+    ).group_by(Share.member_id)
+
+
+def simulate_dividend(db: Session, amount: float, payment_year: int) -> Dict:
+    """
+    Calculate the effect of a dividend without writing anything, from one read of all economics joined with the
+    share totals of their members.
+    """
+    share_totals = get_share_totals_for_dividend(db, payment_year, amount).subquery()
+    rows = (
+        db.query(Economics, share_totals)
+        .outerjoin(share_totals, share_totals.c.member_id == Economics.member_id)
+        .order_by(Economics.id)
+        .all()
+    )
+
+    members = []
+    members_already_done = []
+    members_without_shares = []
+    total_current_value = 0.0
+    for row in rows:
+        member_economics = row.Economics
+        if member_economics.last_dividend_year >= payment_year:
+            members_already_done.append(member_economics.member_id)
+            total_current_value += member_economics.current_value or 0
+            continue
+        if not row.nr_of_shares:
+            members_without_shares.append(member_economics.member_id)
+            total_current_value += member_economics.current_value or 0
+            continue
+
+        economics_update, payout, nr_of_shares_to_reinvest = calculate_member_dividend(
+            member_economics,
+            nr_of_shares=row.nr_of_shares,
+            total_investment=row.total_investment,
+            nr_of_eligible_shares=row.nr_of_eligible_shares,
+            current_value=row.current_value,
+            amount=amount,
+            payment_year=payment_year,
+        )
+        total_current_value += economics_update.current_value
+        members.append(
+            {
+                "member_id": member_economics.member_id,
+                "dividend": amount * row.nr_of_eligible_shares,
+                "payout": payout,
+                "nr_of_shares_to_reinvest": nr_of_shares_to_reinvest,
+                "nr_of_shares": economics_update.nr_of_shares,
+                "current_value": economics_update.current_value,
+                "account_balance": economics_update.account_balance,
+            }
+        )
+
+    return {
+        "payment_year": payment_year,
+        "dividend_per_share": amount,
+        "total_dividend": sum(member["dividend"] for member in members),
+        "total_payout": sum(member["payout"] for member in members if member["payout"] is not None),
+        "nr_of_payouts": sum(1 for member in members if member["payout"] is not None),
+        "nr_of_reinvested_shares": sum(member["nr_of_shares_to_reinvest"] for member in members),
+        "total_current_value": total_current_value,
+        "members_already_done": members_already_done,
+        "members_without_shares": members_without_shares,
+        "members": members,
+    }
+
+
+def make_dividend_set_based(
+    amount: float,
+    payment_year: int,
+    is_historical_fulfillment: bool = False,
+    batch_size: Optional[int] = settings.ECONOMICS_BACKGROUND_BATCH,
+    dividend_run_id: Optional[int] = None,
+):
+    """
+    Set-based alternative to make_dividend. Each batch of economics (the whole table if batch_size is None) is
+    handled with one grouped share aggregate, one share write-down, one bulk economics update and bulk inserts of
+    payments and reinvested shares, all committed together. Progress is checkpointed on the dividend run like in
+    make_dividend.
+    """
+    db: Session = SessionLocal()
+    dividend_run = get_or_create_dividend_run(
+        db, payment_year, DividendEngine.SET_BASED, is_historical_fulfillment, dividend_run_id
+    )
+    try:
+        last_economics_id = dividend_run.last_economics_id
+        while True:
+            members_economics_batch = get_all_economics_dividend(
+                db, last_economics_id, batch_size, dividend_run.end_economics_id
+            )["data"]
+            if not members_economics_batch:
+                break
+
+            last_economics_id = members_economics_batch[-1].id
+            members_economics = [
+                member_economics
+                for member_economics in members_economics_batch
+                if member_economics.last_dividend_year < payment_year
+            ]
+            nr_of_skipped = len(members_economics_batch) - len(members_economics)
+            if nr_of_skipped:
+                get_logger().info(
+                    f"Skipping {nr_of_skipped} members up to economics {last_economics_id}, dividend already done for year {payment_year}"
+                )
+            if not members_economics:
+                checkpoint_dividend_run(db, dividend_run, last_economics_id, members_skipped=nr_of_skipped)
+                continue
+
+            share_totals = {
+                row.member_id: row
+                for row in get_share_totals_for_dividend(db, payment_year, amount)
+                .filter(Share.member_id.in_([member_economics.member_id for member_economics in members_economics]))
+                .all()
+            }
+
+            members_failed = 0
+            economics_updates = []
+            payments = []
+            reinvested_shares = []
+            for member_economics in members_economics:
+                totals = share_totals.get(member_economics.member_id)
+                if not totals:
+                    error_request = ErrorLogCreateRequest(
                         member_id=member_economics.member_id,
-                        year=datetime.now().year,
-                        amount=new_account_balance,
-                        paid_out=False,
+                        comment="Error: no shares found, no dividends done",
+                        resolved=False,
                     )
+                    create_error(db, error_request)
+                    members_failed += 1
 
-                    new_account_balance = 0
-                    db.add(payment)
+                    continue
 
-                nr_of_shares_to_reinvest = int(new_account_balance // settings.SHARE_PRICE)
-                new_account_balance_after_reinvestment = (
-                    new_account_balance - nr_of_shares_to_reinvest * settings.SHARE_PRICE
+                economics_update, payout, nr_of_shares_to_reinvest = calculate_member_dividend(
+                    member_economics,
+                    nr_of_shares=totals.nr_of_shares,
+                    total_investment=totals.total_investment,
+                    nr_of_eligible_shares=totals.nr_of_eligible_shares,
+                    current_value=totals.current_value,
+                    amount=amount,
+                    payment_year=payment_year,
                 )
-                new_current_reinvested = current_reinvested + nr_of_shares_to_reinvest * settings.SHARE_PRICE
-                new_total_investment = current_total_investment + nr_of_shares_to_reinvest * settings.SHARE_PRICE
+                economics_updates.append({"id": member_economics.id, **economics_update.model_dump()})
+
+                if payout is not None:
+                    payments.append(payment_row(member_economics.member_id, payout))
 
-                new_total_current_value_of_share = update_shares_for_dividend(db, shares, payment_year, amount)
-                new_total_current_value_of_shares_with_reinvested_shares = (
-                    new_total_current_value_of_share + nr_of_shares_to_reinvest * settings.SHARE_PRICE
+                if not is_historical_fulfillment:
+                    reinvested_shares.extend(
+                        reinvested_share_rows(member_economics.member_id, nr_of_shares_to_reinvest)
+                    )
+
+            if not economics_updates:
+                checkpoint_dividend_run(
+                    db, dividend_run, last_economics_id, members_skipped=nr_of_skipped, members_failed=members_failed
                 )
+                continue
 
-                economics_update = EconomicsUpdateRequest(
-                    nr_of_shares=current_nr_of_shares + nr_of_shares_to_reinvest,
-                    total_investment=new_total_investment,
-                    current_value=new_total_current_value_of_shares_with_reinvested_shares,
-                    reinvested=new_current_reinvested,
-                    account_balance=new_account_balance_after_reinvestment,
-                    pay_out=member_economics.pay_out,
-                    disbursed=new_disbursed,
-                    last_dividend_year=payment_year,
-                    issued_dividend=datetime.now(timezone.utc),
+            try:
+                write_down_shares_for_dividend(db, list(share_totals), payment_year, amount)
+                db.execute(update(Economics), economics_updates)
+                insert_dividend_rows(db, reinvested_shares, payments)
+                apply_yearly_deltas(db, share_deltas(reinvested_shares), payment_deltas(payments))
+                db.commit()
+                members_processed = len(economics_updates)
+                shares_created = len(reinvested_shares)
+                payouts_created = len(payments)
+            except Exception as ex:
+                db.rollback()
+                get_logger().error(f"failed to commit dividend for economics up to {last_economics_id}, details: {ex}")
+                error_request = ErrorLogCreateRequest(
+                    comment=f"Error: no dividend done for economics batch ending at {last_economics_id}, details: {ex}",
+                    resolved=False,
                 )
+                create_error(db, error_request)
+                members_processed = 0
+                shares_created = 0
+                payouts_created = 0
+                members_failed += len(economics_updates)
+
+            checkpoint_dividend_run(
+                db,
+                dividend_run,
+                last_economics_id,
+                members_processed,
+                nr_of_skipped,
+                members_failed,
+                shares_created,
+                payouts_created,
+            )
+
+        complete_dividend_run(db, dividend_run, amount, payment_year)
+
+    except Exception:
+        db.rollback()
+        set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_FAILED)
+        raise
+
+    finally:
+        db.close()
+
+
+dividend_engines = {
+    DividendEngine.MEMBER: make_dividend,
+    DividendEngine.SET_BASED: make_dividend_set_based,
+}
+
+
+def make_dividend_parallel(
+    amount: float,
+    payment_year: int,
+    engine: DividendEngine = DividendEngine.MEMBER,
+    is_historical_fulfillment: bool = False,
+    dividend_run_id: Optional[int] = None,
+    parallelism: int = settings.DIVIDEND_PARALLELISM,
+):
+    """
+    Split the economics into parallelism id ranges and run the engine on each in its own thread, session and
+    partition run. The dividend is marked completed only when every partition has completed, a resumed run only
+    restarts the partitions that did not.
+    """
+    db: Session = SessionLocal()
+    try:
+        dividend_run = get_or_create_dividend_run(db, payment_year, engine, is_historical_fulfillment, dividend_run_id)
+        partitions = get_dividend_run_partitions(db, dividend_run.id)["data"]
+        if not partitions:
+            partitions = create_dividend_run_partitions(db, dividend_run, parallelism)
+
+        failed_partitions = []
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            futures = {
+                executor.submit(
+                    dividend_engines[DividendEngine(dividend_run.engine)],
+                    amount,
+                    payment_year,
+                    is_historical_fulfillment=dividend_run.is_historical_fulfillment,
+                    dividend_run_id=partition.id,
+                ): partition.id
+                for partition in partitions
+                if partition.status != DIVIDEND_RUN_COMPLETED
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as ex:
+                    get_logger().error(f"failed dividend {payment_year} for partition {futures[future]}, details: {ex}")
+                    failed_partitions.append(futures[future])
+
+        db.expire_all()
+        dividend_run.members_processed = sum(partition.members_processed for partition in partitions)
+        dividend_run.members_skipped = sum(partition.members_skipped for partition in partitions)
+        dividend_run.members_failed = sum(partition.members_failed for partition in partitions)
+        dividend_run.shares_created = sum(partition.shares_created for partition in partitions)
+        dividend_run.payouts_created = sum(partition.payouts_created for partition in partitions)
+        db.commit()
+
+        if failed_partitions:
+            error_request = ErrorLogCreateRequest(
+                comment=f"Error: dividend {payment_year} not completed, failed partitions {sorted(failed_partitions)}",
+                resolved=False,
+            )
+            create_error(db, error_request)
+            set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_FAILED)
+            return
+
+        complete_dividend_run(db, dividend_run, amount, payment_year)
+
+    finally:
+        db.close()
+
+
+def make_dividend_catch_up(amounts: Dict[int, float], dividend_run_id: Optional[int] = None):
+    """
+    Historical fulfillment of several payment years in one pass. amounts maps each payment year to its dividend
+    per share. Every member's shares are read once, the years are applied in order with the economics and share
+    values carried in memory, and each touched economics and share row is written once per batch. Gives the same
+    result as fulfilling the years one by one with is_historical_fulfillment.
+    """
+    payment_years = sorted(amounts)
+    db: Session = SessionLocal()
+    db.expire_on_commit = False
+    if dividend_run_id is not None:
+        dividend_run = get_dividend_run(db, dividend_run_id)["data"][0]
+    else:
+        dividend_run_request = DividendRunCreateRequest(
+            payment_year=payment_years[-1], engine=CATCH_UP_ENGINE, is_historical_fulfillment=True
+        )
+        dividend_run = create_dividend_run(db, dividend_run_request)
+    try:
+        last_economics_id = dividend_run.last_economics_id
+        while True:
+            members_economics_batch = get_all_economics_dividend(
+                db, last_economics_id, settings.ECONOMICS_BACKGROUND_BATCH, dividend_run.end_economics_id
+            )["data"]
+            if not members_economics_batch:
+                break
+
+            last_economics_id = members_economics_batch[-1].id
+            members_economics = [
+                member_economics
+                for member_economics in members_economics_batch
+                if member_economics.last_dividend_year < payment_years[-1]
+            ]
+            nr_of_skipped = len(members_economics_batch) - len(members_economics)
+            shares_by_member = get_shares_grouped_by_member(
+                db, [member_economics.member_id for member_economics in members_economics]
+            )
+
+            members_failed = 0
+            economics_updates = []
+            share_updates = []
+            payments = []
+            for member_economics in members_economics:
+                shares = shares_by_member[member_economics.member_id]["data"]
+                if not shares:
+                    error_request = ErrorLogCreateRequest(
+                        member_id=member_economics.member_id,
+                        comment="Error: no shares found, no dividends done",
+                        resolved=False,
+                    )
+                    create_error(db, error_request)
+                    members_failed += 1
+
+                    continue
 
-                db.query(Economics).filter(Economics.id == member_economics.id).update(economics_update.model_dump())
+                economics_update, share_values, payouts = catch_up_member_dividend(member_economics, shares, amounts)
+                if economics_update is None:
+                    nr_of_skipped += 1
 
-                if not is_historical_fulfillment and nr_of_shares_to_reinvest > 0:
-                    for _ in range(nr_of_shares_to_reinvest):
-                        share = Share(
-                            member_id=member_economics.member_id,
-                            initial_value=settings.SHARE_PRICE,
-                            current_value=settings.SHARE_PRICE,
-                            purchased_at=date((datetime.now().year - 1), 12, 31),
-                            from_internal_account=True,
-                        )
-                        db.add(share)
+                    continue
+
+                economics_updates.append({"id": member_economics.id, **economics_update.model_dump()})
+                share_updates.extend(
+                    {"id": share.id, "current_value": share_values[share.id]}
+                    for share in shares
+                    if share_values[share.id] != share.current_value
+                )
+                payments.extend(payment_row(member_economics.member_id, payout) for payout in payouts)
 
+            members_processed = 0
+            payouts_created = 0
+            if economics_updates:
                 try:
+                    if share_updates:
+                        db.execute(update(Share), share_updates)
+                    db.execute(update(Economics), economics_updates)
+                    insert_dividend_rows(db, [], payments)
+                    apply_yearly_deltas(db, payment_deltas(payments))
                     db.commit()
+                    members_processed = len(economics_updates)
+                    payouts_created = len(payments)
                 except Exception as ex:
                     db.rollback()
                     get_logger().error(
-                        f"failed to commit dividend for member {member_economics.member_id}, details: {ex}"
+                        f"failed to commit catch-up dividend for economics up to {last_economics_id}, details: {ex}"
                     )
                     error_request = ErrorLogCreateRequest(
-                        member_id=member_economics.member_id,
-                        comment=f"Error: no dividend done, details: {ex}",
+                        comment=f"Error: no dividend done for economics batch ending at {last_economics_id}, details: {ex}",
                         resolved=False,
                     )
                     create_error(db, error_request)
-
-        dividend_update = DividendUpdateRequest(dividend_per_share=amount, payment_year=payment_year, completed=True)
-        db.query(Dividend).filter(Dividend.payment_year == payment_year).update(dividend_update.model_dump())
-        db.commit()
-        get_logger().info(f"fulfilled dividend {payment_year} successfully")
+                    members_failed += len(economics_updates)
+
+            checkpoint_dividend_run(
+                db,
+                dividend_run,
+                last_economics_id,
+                members_processed,
+                nr_of_skipped,
+                members_failed,
+                payouts_created=payouts_created,
+            )
+
+        for payment_year in payment_years:
+            dividend_update = DividendUpdateRequest(
+                dividend_per_share=amounts[payment_year], payment_year=payment_year, completed=True
+            )
+            if db.query(Dividend).filter(Dividend.payment_year == payment_year).update(dividend_update.model_dump()):
+                set_yearly_dividend(db, payment_year, amounts[payment_year])
+        set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_COMPLETED)
+        get_logger().info(f"fulfilled dividends {payment_years[0]}-{payment_years[-1]} successfully")
+
+    except Exception:
+        db.rollback()
+        set_dividend_run_status(db, dividend_run, DIVIDEND_RUN_FAILED)
+        raise
 
     finally:
         db.close()
 
 
-def update_shares_for_dividend(db: Session, shares, payment_year: int, amount: float) -> int:
-    new_total_current_value_of_share = 0
-    for share in shares["data"]:
-        if share.purchased_at.year >= payment_year:
-            new_total_current_value_of_share += share.current_value
+def catch_up_member_dividend(
+    member_economics: Economics, shares: List[Share], amounts: Dict[int, float]
+) -> Tuple[Optional[EconomicsUpdateRequest], Dict[int, float], List[float]]:
+    """
+    Apply the payment years the member has not received yet in order, in memory. Returns the economics after the
+    last year (None if no year applied), the current value of each share by id and the payout of every year the member is paid out.
+    """
+    share_values = {share.id: share.current_value for share in shares}
+    total_investment = sum(share.initial_value for share in shares)
+    economics = member_economics
+    payouts = []
+    for payment_year in sorted(amounts):
+        # Like the fulfill endpoint, a year without dividend does not touch the members
+        if economics.last_dividend_year >= payment_year or not amounts[payment_year]:
             continue
 
-        new_current_value = max(share.current_value - amount, 0)
-        new_total_current_value_of_share += new_current_value
-
-        share_update = ShareUpdateRequest(
-            comment=share.comment,
-            purchased_at=share.purchased_at,
-            member_id=share.member_id,
-            initial_value=share.initial_value,
-            current_value=new_current_value,
-            from_internal_account=share.from_internal_account,
+        amount = amounts[payment_year]
+        eligible_shares = [share for share in shares if share.purchased_at.year < payment_year]
+        for share in eligible_shares:
+            share_values[share.id] = max(share_values[share.id] - amount, 0)
+
+        economics, payout, _ = calculate_member_dividend(
+            economics,
+            nr_of_shares=len(shares),
+            total_investment=total_investment,
+            nr_of_eligible_shares=len(eligible_shares),
+            current_value=sum(share_values.values()),
+            amount=amount,
+            payment_year=payment_year,
         )
-        db.query(Share).filter(Share.id == share.id).update(share_update.model_dump())
+        if payout is not None:
+            payouts.append(payout)
+
+    if economics is member_economics:
+        return None, share_values, payouts
+    return economics, share_values, payouts
+
+
+def write_down_shares_for_dividend(db: Session, member_ids: List[int], payment_year: int, amount: float):
+    """
+    Lower the current value of the members' shares bought before the payment year by amount, not below zero, in a
+    single UPDATE.
+    """
+    db.query(Share).filter(
+        Share.member_id.in_(member_ids),
+        Share.purchased_at < datetime(payment_year, 1, 1),
+    ).update({Share.current_value: written_down_share_value(amount)}, synchronize_session=False)
+
+
+def write_down_shares(db: Session, share_ids: List[int], amount: float):
+    """
+    Lower the current value of the shares by amount, not below zero, in a single UPDATE.
+    """
+    if share_ids:
+        db.query(Share).filter(Share.id.in_(share_ids)).update(
+            {Share.current_value: written_down_share_value(amount)}, synchronize_session=False
+        )
+
 
-    return new_total_current_value_of_share
+def written_down_current_value(shares: List[Share], payment_year: int, amount: float) -> float:
+    """
+    Total current value of the shares after write_down_shares_for_dividend, computed from the loaded shares.
+    """
+    eligible_before = datetime(payment_year, 1, 1)
+    return sum(
+        max(share.current_value - amount, 0) if share.purchased_at < eligible_before else share.current_value
+        for share in shares
+    )
 
 
 def delete_all_member_data(db: Session, member_id: int):
 
     member = db.query(Member).filter(Member.id == member_id).first()
 
-    db.query(Share).filter(Share.member_id == member_id).delete()
+    shares = db.execute(
+        delete(Share).where(Share.member_id == member_id).returning(Share.purchased_at, Share.from_internal_account)
+    ).all()
     db.query(Economics).filter(Economics.member_id == member_id).delete()
-    db.query(Payment).filter(Payment.member_id == member_id).delete()
-    db.query(Member).filter(Member.id == member_id).delete()
+    payments = db.execute(
+        delete(Payment).where(Payment.member_id == member_id).returning(Payment.year, Payment.amount)
+    ).all()
+    members = db.execute(delete(Member).where(Member.id == member_id).returning(Member.year, Member.created_at)).all()
+    apply_yearly_deltas(db, share_deltas(shares, -1), payment_deltas(payments, -1), member_deltas(members, -1))
 
     try:
         db.commit()
@@ -183,23 +844,5 @@ def delete_all_member_data(db: Session, member_id: int):
         create_error(db, error_request)
         return False
 
-    try:
-        last_item_member = db.query(Member).order_by(Member.id.desc()).first()
-        alter_sequence_query_member = f"ALTER SEQUENCE members_id_seq RESTART WITH {last_item_member.id + 1}"
-        db.execute(text(alter_sequence_query_member))
-
-        last_item_shares = db.query(Share).order_by(Share.id.desc()).first()
-        alter_sequence_query_shares = f"ALTER SEQUENCE shares_id_seq RESTART WITH {last_item_shares.id + 1}"
-        db.execute(text(alter_sequence_query_shares))
-
-        db.commit()
-    except Exception as ex:
-        db.rollback()
-        error_request = ErrorLogCreateRequest(
-            member_id=member_id,
-            comment=f"Error resetting member and shares sequence after deletion of member {member_id}, details: {ex}",
-            resolved=False,
-        )
-        create_error(db, error_request)
-
+    unindex_member(db, member_id)
     return member
@@ -0,0 +1,239 @@
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+from sqlalchemy import case, delete, extract, func, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from solarpark.persistence.counts import on_tables_committed
+from solarpark.persistence.dividend_runs import as_utc
+from solarpark.persistence.economics import get_total_account_balance, get_total_disbursed
+from solarpark.persistence.error_log import get_all_unresolved_errors
+from solarpark.persistence.leads import count_all_leads
+from solarpark.persistence.models.analytics import AnalyticsSnapshot, AnalyticsYear
+from solarpark.persistence.models.dividends import Dividend
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.payments import Payment
+from solarpark.persistence.models.shares import Share
+from solarpark.persistence.payments import get_year_payments
+from solarpark.persistence.shares import get_share_statistics
+from solarpark.settings import settings
+
+SNAPSHOT_ID = 1
+ANALYTICS_TABLES = {"members", "shares", "economics", "payments", "errors", "leads"}
+
+# Databases with commits to the analytics tables since their snapshot was last refreshed by this process
+_stale_databases: Set[str] = set()
+# Databases with a snapshot refresh scheduled or running in the background
+_refreshing_databases: Set[str] = set()
+_refreshing_lock = threading.Lock()
+
+
+def database_key(db: Session) -> str:
+    return db.get_bind().url.render_as_string(hide_password=True)
+
+
+@on_tables_committed
+def mark_analytics_stale(db: Session, tables: Set[str]):
+    if tables & ANALYTICS_TABLES:
+        _stale_databases.add(database_key(db))
+
+
+def compute_analytics(db: Session) -> Dict:
+    share_statistics = get_share_statistics(db)
+    all_members = share_statistics["all_with_shares"]
+    all_member_organizations = share_statistics["org_with_shares"]
+    all_shares_solarpark_excluded = share_statistics["all_shares"]
+    reinvested_shares = share_statistics["reinvested_shares"]
+
+    return {
+        "errors": {"unresolved_errors": get_all_unresolved_errors(db)},
+        "members": {
+            "total_count": all_members,
+            "private_persons": all_members - all_member_organizations,
+            "organizations": all_member_organizations,
+        },
+        "shares": {
+            "total_count": all_shares_solarpark_excluded,
+            "total_count_solarpark_shares": share_statistics["all_solarpark_shares"],
+            "reinvested_count": reinvested_shares,
+            "org_more_than_one_share": share_statistics["org_more_than_one_share"],
+            "average_share_count_per_member": round(all_shares_solarpark_excluded / all_members),
+        },
+        "economics": {
+            "total_value": all_shares_solarpark_excluded * settings.SHARE_PRICE,
+            "reinvested_value": reinvested_shares * settings.SHARE_PRICE,
+            "total_account_balance": get_total_account_balance(db),
+        },
+        "payments": {
+            "total_disbursed": get_total_disbursed(db),
+            "year_payments": get_year_payments(db),
+        },
+        "leads": {
+            "total_leads": count_all_leads(db),
+        },
+    }
+
+
+def refresh_analytics_snapshot(db: Session) -> AnalyticsSnapshot:
+    # Cleared before computing so that writes committed meanwhile mark the new snapshot stale again
+    _stale_databases.discard(database_key(db))
+    snapshot = AnalyticsSnapshot(id=SNAPSHOT_ID, data=compute_analytics(db), refreshed_at=datetime.now(timezone.utc))
+    try:
+        stored_snapshot = db.merge(snapshot)
+        db.commit()
+        return stored_snapshot
+    except IntegrityError:
+        # Another request stored its snapshot first, serve this one without storing it
+        db.rollback()
+        return snapshot
+
+
+def refresh_analytics_snapshot_in_background(bind: Engine):
+    """
+    Refresh the snapshot in a session of its own, for a background task after claim_snapshot_refresh.
+    """
+    with Session(bind=bind) as db:
+        try:
+            refresh_analytics_snapshot(db)
+        finally:
+            with _refreshing_lock:
+                _refreshing_databases.discard(database_key(db))
+
+
+def get_analytics_snapshot(db: Session, fresh: bool = False) -> AnalyticsSnapshot:
+    """
+    The stored analytics, only computed here when fresh is set or no snapshot has been stored yet. Refreshing an
+    out of date snapshot is left to claim_snapshot_refresh and a background task.
+    """
+    snapshot = db.get(AnalyticsSnapshot, SNAPSHOT_ID)
+    if fresh or snapshot is None:
+        return refresh_analytics_snapshot(db)
+    return snapshot
+
+
+def claim_snapshot_refresh(db: Session, snapshot: AnalyticsSnapshot) -> bool:
+    """
+    Whether the snapshot should be refreshed in the background: members, shares, economics, payments, errors or
+    leads have been written since the last refresh, or it is older than ANALYTICS_SNAPSHOT_MAX_AGE seconds, which
+    covers writes by other processes and the change of year for the year's payments. Only the first caller gets
+    True until that refresh has finished, so concurrent requests schedule one refresh between them.
+    """
+    database = database_key(db)
+    if (
+        database not in _stale_databases
+        and (datetime.now(timezone.utc) - as_utc(snapshot.refreshed_at)).total_seconds()
+        <= settings.ANALYTICS_SNAPSHOT_MAX_AGE
+    ):
+        return False
+
+    with _refreshing_lock:
+        if database in _refreshing_databases:
+            return False
+        _refreshing_databases.add(database)
+    return True
+
+
+def compute_yearly_rollups(db: Session) -> Dict[int, Dict]:
+    """
+    Shares bought and reinvested by purchase year, the completed dividend per share by payment year, payouts by
+    year and new members by membership year (when they were registered if not set), from one grouped query per
+    table.
+    """
+    rollups = defaultdict(
+        lambda: {
+            "shares_bought": 0,
+            "reinvested_shares": 0,
+            "dividend_per_share": None,
+            "nr_of_payouts": 0,
+            "payout_amount": 0.0,
+            "new_members": 0,
+        }
+    )
+
+    purchase_year = extract("year", Share.purchased_at)
+    is_reinvested = case((Share.from_internal_account.is_(True), 1), else_=0)
+    for year, nr_of_shares, reinvested_shares in db.query(
+        purchase_year, func.count(Share.id), func.sum(is_reinvested)
+    ).group_by(purchase_year):
+        # EXTRACT gives a numeric on PostgreSQL
+        rollups[int(year)]["shares_bought"] = nr_of_shares - reinvested_shares
+        rollups[int(year)]["reinvested_shares"] = reinvested_shares
+
+    for year, dividend_per_share in db.query(Dividend.payment_year, Dividend.dividend_per_share).filter(
+        Dividend.completed.is_(True)
+    ):
+        rollups[year]["dividend_per_share"] = dividend_per_share
+
+    for year, nr_of_payouts, payout_amount in (
+        db.query(Payment.year, func.count(Payment.id), func.coalesce(func.sum(Payment.amount), 0))
+        .filter(Payment.year.is_not(None))
+        .group_by(Payment.year)
+    ):
+        rollups[year]["nr_of_payouts"] = nr_of_payouts
+        rollups[year]["payout_amount"] = payout_amount
+
+    member_year = extract("year", func.coalesce(Member.year, Member.created_at))
+    for year, new_members in db.query(member_year, func.count(Member.id)).group_by(member_year):
+        if year is not None:
+            rollups[int(year)]["new_members"] = new_members
+
+    total_members = 0
+    for year in sorted(rollups):
+        total_members += rollups[year]["new_members"]
+        rollups[year]["total_members"] = total_members
+    return dict(rollups)
+
+
+def refresh_yearly_rollups(db: Session):
+    """
+    Rebuild the analytics_years table from the shares, payments, dividends and members tables. Writes keep the table
+    up to date themselves, this only repairs it, on request.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Waits for the transactions with rollup updates in progress and holds off new ones until the rebuild is
+        # committed, so that none is lost or counted twice
+        db.execute(text("LOCK TABLE analytics_years IN SHARE ROW EXCLUSIVE MODE"))
+    rollups = compute_yearly_rollups(db)
+    try:
+        db.execute(delete(AnalyticsYear))
+        if rollups:
+            db.execute(insert(AnalyticsYear), [{"year": year, **rollup} for year, rollup in rollups.items()])
+        db.commit()
+    except IntegrityError:
+        # Rebuilt by another request at the same time
+        db.rollback()
+
+
+def build_yearly_rollups_if_empty(db: Session):
+    """
+    Fill an empty analytics_years table from the tables, on a database whose members, shares, payments and
+    dividends were written before the table was kept up to date by the writes themselves.
+    """
+    if db.query(AnalyticsYear.year).first() is None:
+        refresh_yearly_rollups(db)
+
+
+def get_yearly_rollups(
+    db: Session, from_year: Optional[int] = None, to_year: Optional[int] = None, fresh: bool = False
+) -> Dict:
+    """
+    Yearly rollups from the analytics_years table, one row per year. Writes to shares, payments, dividends and
+    members update their years of the table in the same transaction, fresh rebuilds it from those tables first.
+    An empty table is built on first read.
+    """
+    if fresh:
+        refresh_yearly_rollups(db)
+    else:
+        build_yearly_rollups_if_empty(db)
+
+    query = db.query(AnalyticsYear).order_by(AnalyticsYear.year)
+    if from_year is not None:
+        query = query.filter(AnalyticsYear.year >= from_year)
+    if to_year is not None:
+        query = query.filter(AnalyticsYear.year <= to_year)
+    result = query.all()
+    return {"data": result, "total": len(result)}
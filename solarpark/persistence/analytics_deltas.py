@@ -0,0 +1,122 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from solarpark.persistence.models.analytics import AnalyticsYear
+
+# Counter changes per year, by analytics_years column
+YearlyDeltas = Dict[int, Dict[str, float]]
+
+
+def field(row, name: str):
+    # ORM objects and result rows, or the row dicts the dividend engines bulk insert
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def share_deltas(shares: Iterable, sign: int = 1) -> YearlyDeltas:
+    deltas = defaultdict(lambda: defaultdict(int))
+    for share in shares:
+        counter = "reinvested_shares" if field(share, "from_internal_account") else "shares_bought"
+        deltas[field(share, "purchased_at").year][counter] += sign
+    return deltas
+
+
+def payment_deltas(payments: Iterable, sign: int = 1) -> YearlyDeltas:
+    deltas = defaultdict(lambda: defaultdict(int))
+    for payment in payments:
+        year = field(payment, "year")
+        if year is None:
+            continue
+        deltas[year]["nr_of_payouts"] += sign
+        deltas[year]["payout_amount"] += sign * (field(payment, "amount") or 0)
+    return deltas
+
+
+def member_deltas(members: Iterable, sign: int = 1) -> YearlyDeltas:
+    deltas = defaultdict(lambda: defaultdict(int))
+    for member in members:
+        # Members without a membership year count from when they were registered, which is now for a new member
+        registered = field(member, "year") or field(member, "created_at") or datetime.now(timezone.utc)
+        deltas[registered.year]["new_members"] += sign
+    return deltas
+
+
+def create_year(db: Session, year: int):
+    """
+    Insert an empty row for the year, carrying over the total members of the latest year before it.
+    """
+    previous_total_members = (
+        select(AnalyticsYear.total_members)
+        .where(AnalyticsYear.year < year)
+        .order_by(AnalyticsYear.year.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    try:
+        with db.begin_nested():
+            db.execute(
+                insert(AnalyticsYear).values(
+                    year=year,
+                    shares_bought=0,
+                    reinvested_shares=0,
+                    nr_of_payouts=0,
+                    payout_amount=0,
+                    new_members=0,
+                    total_members=func.coalesce(previous_total_members, 0),
+                )
+            )
+    except IntegrityError:
+        # Created by a concurrent write
+        pass
+
+
+def update_year(db: Session, year: int, values: Dict):
+    query = db.query(AnalyticsYear).filter(AnalyticsYear.year == year)
+    if not query.update(values, synchronize_session=False):
+        create_year(db, year)
+        query.update(values, synchronize_session=False)
+
+
+def apply_yearly_deltas(db: Session, *deltas: YearlyDeltas):
+    """
+    Add the counter changes to the analytics_years rows with one UPDATE per year computed in the database, creating
+    the years not there yet. New members also move the total members of every later year. Does not commit, the
+    caller commits it together with the writes it counts.
+    """
+    combined = defaultdict(lambda: defaultdict(int))
+    for year_deltas in deltas:
+        for year, counters in year_deltas.items():
+            for name, value in counters.items():
+                combined[year][name] += value
+
+    for year, counters in sorted(combined.items()):
+        counters = {name: value for name, value in counters.items() if value}
+        if not counters:
+            continue
+
+        update_year(
+            db,
+            year,
+            {getattr(AnalyticsYear, name): getattr(AnalyticsYear, name) + value for name, value in counters.items()},
+        )
+        if counters.get("new_members"):
+            db.query(AnalyticsYear).filter(AnalyticsYear.year >= year).update(
+                {AnalyticsYear.total_members: AnalyticsYear.total_members + counters["new_members"]},
+                synchronize_session=False,
+            )
+
+
+def set_yearly_dividend(db: Session, year: int, dividend_per_share: Optional[float]):
+    """
+    Record the dividend per share of the year, None when its dividend is not completed or was removed. Does not
+    commit.
+    """
+    update_year(db, year, {AnalyticsYear.dividend_per_share: dividend_per_share})
+
+
+def set_dividend_in_rollups(db: Session, dividend):
+    set_yearly_dividend(db, dividend.payment_year, dividend.dividend_per_share if dividend.completed else None)
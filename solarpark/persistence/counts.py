@@ -0,0 +1,116 @@
+# pylint: disable=W0613
+import threading
+import time
+from enum import Enum
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from solarpark.settings import settings
+
+# Tables a session has inserted into or deleted from, and tables it has written to in any way
+WRITTEN_TABLES = "written_tables"
+CHANGED_TABLES = "changed_tables"
+
+# (database, table) -> (count, time counted), with a generation per key that is bumped on every invalidation so that
+# a count taken while another session commits is not cached
+_cached_counts: Dict[Tuple[str, str], Tuple[int, float]] = {}
+_generations: Dict[Tuple[str, str], int] = {}
+_lock = threading.Lock()
+
+# Called with the session and the tables it wrote to after every commit
+_commit_listeners: List[Callable[[Session, Set[str]], None]] = []
+
+
+class TotalCount(str, Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+
+
+def count_rows(db: Session, model, total: TotalCount = TotalCount.EXACT) -> int:
+    """
+    Number of rows in the model's table. The exact count is cached per table until a session writes to it or
+    COUNT_CACHE_SECONDS pass. The estimate is PostgreSQL's planner statistics (pg_class.reltuples), other databases
+    and tables that have not been analyzed yet get the exact count.
+    """
+    table = model.__table__.name
+    if total == TotalCount.ESTIMATED and db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+
+    key = (db.get_bind().url.render_as_string(hide_password=True), table)
+    with _lock:
+        cached = _cached_counts.get(key)
+        generation = _generations.get(key, 0)
+    if cached and time.monotonic() - cached[1] < settings.COUNT_CACHE_SECONDS:
+        return cached[0]
+
+    count = db.query(model).count()
+    # The session's own uncommitted writes are not visible to other sessions
+    if table not in db.info.get(WRITTEN_TABLES, set()):
+        with _lock:
+            if _generations.get(key, 0) == generation:
+                _cached_counts[key] = (count, time.monotonic())
+    return count
+
+
+def on_tables_committed(listener: Callable[[Session, Set[str]], None]):
+    """
+    Register a function to call after a session commits writes, with the names of the tables it inserted into,
+    updated or deleted from.
+    """
+    _commit_listeners.append(listener)
+    return listener
+
+
+def invalidate_counts(db: Session, tables: Iterable[str]):
+    database = db.get_bind().url.render_as_string(hide_password=True)
+    with _lock:
+        for table in tables:
+            key = (database, table)
+            _cached_counts.pop(key, None)
+            _generations[key] = _generations.get(key, 0) + 1
+
+
+def mark_written(db: Session, tables: Iterable[str], rows_added_or_removed: bool = True):
+    tables = set(tables)
+    db.info.setdefault(CHANGED_TABLES, set()).update(tables)
+    if rows_added_or_removed:
+        db.info.setdefault(WRITTEN_TABLES, set()).update(tables)
+        invalidate_counts(db, tables)
+
+
+@event.listens_for(Session, "after_flush")
+def track_flushed_tables(session: Session, flush_context):
+    mark_written(session, {instance.__table__.name for instance in chain(session.new, session.deleted)})
+    mark_written(session, {instance.__table__.name for instance in session.dirty}, rows_added_or_removed=False)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_bulk_writes(orm_execute_state: ORMExecuteState):
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        mark_written(orm_execute_state.session, [orm_execute_state.statement.table.name])
+    elif orm_execute_state.is_update:
+        mark_written(orm_execute_state.session, [orm_execute_state.statement.table.name], rows_added_or_removed=False)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_tables(session: Session):
+    invalidate_counts(session, session.info.pop(WRITTEN_TABLES, set()))
+    changed_tables = session.info.pop(CHANGED_TABLES, set())
+    if changed_tables:
+        for listener in _commit_listeners:
+            listener(session, changed_tables)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def forget_rolled_back_tables(session: Session, transaction):
+    # A rolled back savepoint leaves the writes of its enclosing transaction to be invalidated on commit
+    if transaction.parent is None:
+        session.info.pop(WRITTEN_TABLES, None)
+        session.info.pop(CHANGED_TABLES, None)
@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from solarpark.models.dividend_runs import DividendRun as DividendRunModel
+from solarpark.models.dividend_runs import DividendRunCreateRequest
+from solarpark.persistence.models.dividend_runs import DividendRun
+from solarpark.persistence.models.economics import Economics
+from solarpark.settings import settings
+
+DIVIDEND_RUN_RUNNING = "running"
+DIVIDEND_RUN_COMPLETED = "completed"
+DIVIDEND_RUN_FAILED = "failed"
+
+# Engine recorded on multi-year catch-up runs, which are not started through DividendEngine
+CATCH_UP_ENGINE = "catch_up"
+
+
+def create_dividend_run(db: Session, dividend_run_request: DividendRunCreateRequest):
+    dividend_run = DividendRun(
+        payment_year=dividend_run_request.payment_year,
+        engine=dividend_run_request.engine,
+        is_historical_fulfillment=dividend_run_request.is_historical_fulfillment,
+        status=DIVIDEND_RUN_RUNNING,
+        last_economics_id=0,
+        total_economics=count_economics(db),
+        members_processed=0,
+        members_skipped=0,
+        members_failed=0,
+        shares_created=0,
+        payouts_created=0,
+        heartbeat_at=datetime.now(timezone.utc),
+        started_at=datetime.now(timezone.utc),
+        members_done_at_start=0,
+    )
+    db.add(dividend_run)
+    db.commit()
+    db.refresh(dividend_run)
+    return dividend_run
+
+
+def count_economics(db: Session, last_economics_id: int = 0, end_economics_id: Optional[int] = None) -> int:
+    query = db.query(func.count(Economics.id)).filter(Economics.id > last_economics_id)
+    if end_economics_id is not None:
+        query = query.filter(Economics.id <= end_economics_id)
+    return query.scalar()
+
+
+def get_dividend_run(db: Session, dividend_run_id: int):
+    result = db.query(DividendRun).filter(DividendRun.id == dividend_run_id).all()
+    return {"data": result, "total": len(result)}
+
+
+def get_dividend_run_partitions(db: Session, dividend_run_id: int):
+    result = db.query(DividendRun).filter(DividendRun.parent_id == dividend_run_id).order_by(DividendRun.id).all()
+    return {"data": result, "total": len(result)}
+
+
+def create_dividend_run_partitions(db: Session, dividend_run: DividendRun, nr_of_partitions: int) -> List[DividendRun]:
+    """
+    Split the economics id space after the run's checkpoint into contiguous id ranges, one child run per range.
+    """
+    first_economics_id, last_economics_id = (
+        db.query(func.min(Economics.id), func.max(Economics.id))
+        .filter(Economics.id > dividend_run.last_economics_id)
+        .one()
+    )
+    if first_economics_id is None:
+        return []
+
+    partition_size = -(-(last_economics_id - first_economics_id + 1) // nr_of_partitions)
+    partitions = []
+    for start in range(first_economics_id, last_economics_id + 1, partition_size):
+        end = min(start + partition_size - 1, last_economics_id)
+        partitions.append(
+            DividendRun(
+                parent_id=dividend_run.id,
+                payment_year=dividend_run.payment_year,
+                engine=dividend_run.engine,
+                is_historical_fulfillment=dividend_run.is_historical_fulfillment,
+                status=DIVIDEND_RUN_RUNNING,
+                last_economics_id=start - 1,
+                end_economics_id=end,
+                total_economics=count_economics(db, start - 1, end),
+                members_processed=0,
+                members_skipped=0,
+                members_failed=0,
+                shares_created=0,
+                payouts_created=0,
+                heartbeat_at=datetime.now(timezone.utc),
+                started_at=datetime.now(timezone.utc),
+                members_done_at_start=0,
+            )
+        )
+    db.add_all(partitions)
+    db.commit()
+    return partitions
+
+
+def checkpoint_dividend_run(
+    db: Session,
+    dividend_run: DividendRun,
+    last_economics_id: int,
+    members_processed: int = 0,
+    members_skipped: int = 0,
+    members_failed: int = 0,
+    shares_created: int = 0,
+    payouts_created: int = 0,
+):
+    dividend_run.last_economics_id = last_economics_id
+    dividend_run.members_processed += members_processed
+    dividend_run.members_skipped += members_skipped
+    dividend_run.members_failed += members_failed
+    dividend_run.shares_created += shares_created
+    dividend_run.payouts_created += payouts_created
+    dividend_run.heartbeat_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def heartbeat_dividend_run(db: Session, dividend_run: DividendRun):
+    """
+    Record that a worker is processing the run, checkpoints do this after every batch.
+    """
+    dividend_run.heartbeat_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def last_heartbeat(db: Session, dividend_run: DividendRun) -> Optional[datetime]:
+    """
+    The latest heartbeat of the run or, for a parallel run, of any of its partitions.
+    """
+    runs = [dividend_run, *get_dividend_run_partitions(db, dividend_run.id)["data"]]
+    return max((as_utc(run.heartbeat_at) for run in runs if run.heartbeat_at is not None), default=None)
+
+
+def claim_dividend_run(db: Session, dividend_run: DividendRun) -> bool:
+    """
+    Set the run running again for a resume. A running run is only claimed once its last heartbeat is older than
+    DIVIDEND_RUN_LEASE_SECONDS, since a worker may still be processing it. The claim is an UPDATE conditional on the
+    status and heartbeat read, so of two concurrent resumes only one gets the run.
+    """
+    now = datetime.now(timezone.utc)
+    heartbeat = last_heartbeat(db, dividend_run)
+    if (
+        dividend_run.status == DIVIDEND_RUN_RUNNING
+        and heartbeat is not None
+        and now - heartbeat < timedelta(seconds=settings.DIVIDEND_RUN_LEASE_SECONDS)
+    ):
+        return False
+
+    unchanged_heartbeat = (
+        DividendRun.heartbeat_at.is_(None)
+        if dividend_run.heartbeat_at is None
+        else DividendRun.heartbeat_at == dividend_run.heartbeat_at
+    )
+    claimed = (
+        db.query(DividendRun)
+        .filter(DividendRun.id == dividend_run.id, DividendRun.status == dividend_run.status, unchanged_heartbeat)
+        .update(
+            {
+                DividendRun.status: DIVIDEND_RUN_RUNNING,
+                DividendRun.heartbeat_at: now,
+                DividendRun.started_at: now,
+                DividendRun.members_done_at_start: count_members_done(db, dividend_run),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    db.refresh(dividend_run)
+    return claimed == 1
+
+
+def count_members_done(db: Session, dividend_run: DividendRun) -> int:
+    """
+    Members processed, skipped or failed so far, summed over the partitions of a parallel run.
+    """
+    runs = get_dividend_run_partitions(db, dividend_run.id)["data"] or [dividend_run]
+    return sum(run.members_processed + run.members_skipped + run.members_failed for run in runs)
+
+
+def set_dividend_run_status(db: Session, dividend_run: DividendRun, status: str):
+    dividend_run.status = status
+    db.commit()
+
+
+def get_dividend_run_status(db: Session, dividend_run: DividendRun) -> Dict:
+    """
+    Progress of a dividend run from its checkpointed counters. A parallel run is summed over its partitions while
+    they are running. The elapsed time, rate and ETA are taken over the members done since the run last entered
+    running, so that the time a run lay interrupted before a resume does not lower its rate.
+    """
+    status = DividendRunModel.model_validate(dividend_run).model_dump()
+
+    partitions = get_dividend_run_partitions(db, dividend_run.id)["data"]
+    if partitions and dividend_run.status == DIVIDEND_RUN_RUNNING:
+        for counter in ["members_processed", "members_skipped", "members_failed", "shares_created", "payouts_created"]:
+            status[counter] = sum(getattr(partition, counter) for partition in partitions)
+
+    started_at = as_utc(dividend_run.started_at or dividend_run.created_at)
+    finished_at = (
+        as_utc(dividend_run.updated_at)
+        if dividend_run.status != DIVIDEND_RUN_RUNNING and dividend_run.updated_at
+        else datetime.now(timezone.utc)
+    )
+    elapsed_seconds = max((finished_at - started_at).total_seconds(), 0.0)
+
+    members_done = status["members_processed"] + status["members_skipped"] + status["members_failed"]
+    members_done_since_start = max(members_done - dividend_run.members_done_at_start, 0)
+    members_per_second = members_done_since_start / elapsed_seconds if elapsed_seconds else 0.0
+
+    eta_seconds = None
+    if dividend_run.status == DIVIDEND_RUN_COMPLETED:
+        eta_seconds = 0.0
+    elif (
+        dividend_run.status == DIVIDEND_RUN_RUNNING and dividend_run.total_economics is not None and members_per_second
+    ):
+        eta_seconds = max(dividend_run.total_economics - members_done, 0) / members_per_second
+
+    status.update(elapsed_seconds=elapsed_seconds, members_per_second=members_per_second, eta_seconds=eta_seconds)
+    return status
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    # SQLite returns server_default timestamps without timezone, they are in UTC
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
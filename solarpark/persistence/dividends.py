@@ -5,6 +5,7 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from solarpark.models.dividends import DividendCreateRequest, DividendUpdateRequest
+from solarpark.persistence.analytics_deltas import set_dividend_in_rollups, set_yearly_dividend
 from solarpark.persistence.models.dividends import Dividend
 
 
@@ -15,6 +16,7 @@ def create_dividend(db: Session, dividend_request: DividendCreateRequest):
         completed=dividend_request.completed,
     )
     db.add(dividend)
+    set_dividend_in_rollups(db, dividend)
     db.commit()
     db.refresh(dividend)
     return dividend
@@ -35,7 +37,22 @@ def get_dividend_by_year(db: Session, dividend_year: int):
     return {"data": result, "total": len(result)}
 
 
+def get_dividends_by_year_range(db: Session, from_year: int, to_year: int):
+    result = (
+        db.query(Dividend)
+        .filter(Dividend.payment_year >= from_year, Dividend.payment_year <= to_year)
+        .order_by(Dividend.payment_year)
+        .all()
+    )
+    return {"data": result, "total": len(result)}
+
+
 def update_dividend(db: Session, dividend_id: int, dividend_update: DividendUpdateRequest):
+    payment_year = db.query(Dividend.payment_year).filter(Dividend.id == dividend_id).scalar()
+    if payment_year is not None:
+        if payment_year != dividend_update.payment_year:
+            set_yearly_dividend(db, payment_year, None)
+        set_dividend_in_rollups(db, dividend_update)
     db.query(Dividend).filter(Dividend.id == dividend_id).update(dividend_update.model_dump())
     db.commit()
     return db.query(Dividend).filter(Dividend.id == dividend_id).first()
@@ -72,6 +89,7 @@ def delete_dividend(db: Session, dividend_id: int):
     dividend = db.query(Dividend).filter(Dividend.id == dividend_id).first()
     deleted = db.query(Dividend).filter(Dividend.id == dividend_id).delete()
     if deleted == 1:
+        set_yearly_dividend(db, dividend.payment_year, None)
         db.commit()
         return dividend
     return False
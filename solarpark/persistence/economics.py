@@ -1,11 +1,14 @@
 # pylint: disable=singleton-comparison,W0622
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sqlalchemy import func, text
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from solarpark.models.economics import EconomicsCreateRequest, EconomicsUpdateRequest
+from solarpark.persistence.counts import TotalCount, count_rows
+from solarpark.persistence.lookups import get_by_member_ids
 from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.pagination import get_page
 
 
 def create_economics(db: Session, economics_request: EconomicsCreateRequest):
@@ -41,42 +44,34 @@ def get_economics_by_member(db: Session, member_id: int):
     return {"data": result, "total": len(result)}
 
 
+def get_economics_by_member_list(db: Session, member_ids: List[int]):
+    return get_by_member_ids(db, Economics, member_ids)
+
+
 def update_economics(db: Session, economics_id: int, economics_update: EconomicsUpdateRequest):
     db.query(Economics).filter(Economics.id == economics_id).update(economics_update.model_dump())
     db.commit()
     return db.query(Economics).filter(Economics.id == economics_id).first()
 
 
-def get_all_economics(db: Session, sort: List, range: List) -> Dict:
-    total_count = db.query(Economics).count()
-
-    # Pagination and sort order
-    if len(range) == 2 and len(sort) == 2:
-        return {
-            "data": db.query(Economics)
-            .order_by(text(f"{sort[0]} {sort[1].lower()}"))
-            .offset(range[0])
-            .limit(range[1])
-            .all(),
-            "total": total_count,
-        }
+def get_all_economics(
+    db: Session, sort: List, range: List, cursor: Optional[str] = None, total: TotalCount = TotalCount.EXACT
+) -> Dict:
+    total_count = count_rows(db, Economics, total)
 
-    # Pagination only
-    if len(range) == 2:
-        return {
-            "data": db.query(Economics).order_by(Economics.id).offset(range[0]).limit(range[1]).all(),
-            "total": total_count,
-        }
-
-    return {
-        "data": db.query(Economics).order_by(Economics.id).offset(0).limit(10).all(),
-        "total": total_count,
-    }
+    return {**get_page(db.query(Economics), Economics, sort, range, cursor), "total": total_count}
 
 
-def get_all_economics_dividend(db: Session, range: List) -> Dict:
+def get_all_economics_dividend(
+    db: Session, last_economics_id: int, batch_size: Optional[int], end_economics_id: Optional[int] = None
+) -> Dict:
+    query = db.query(Economics).filter(Economics.id > last_economics_id).order_by(Economics.id)
+    if end_economics_id is not None:
+        query = query.filter(Economics.id <= end_economics_id)
+    if batch_size:
+        query = query.limit(batch_size)
     return {
-        "data": db.query(Economics).order_by(Economics.id).offset(range[0]).limit(range[1]).all(),
+        "data": query.all(),
     }
 
 
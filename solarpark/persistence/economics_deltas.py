@@ -0,0 +1,36 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from solarpark.persistence.models.economics import Economics
+from solarpark.settings import settings
+
+
+def apply_economics_delta(
+    db: Session, member_id: int, nr_of_shares: int = 0, total_investment: float = 0, current_value: float = 0
+):
+    """
+    Add to a member's share totals with a single UPDATE computed in the database, without reading the member's
+    shares or economics. Does not commit, the caller commits it together with the share change. The solar park's
+    own shares are not tracked in economics.
+    """
+    if member_id == settings.SOLARPARK_MEMBER_ID:
+        return
+    if not (nr_of_shares or total_investment or current_value):
+        return
+
+    db.query(Economics).filter(Economics.member_id == member_id).update(
+        {
+            Economics.nr_of_shares: func.coalesce(Economics.nr_of_shares, 0) + nr_of_shares,
+            Economics.total_investment: func.coalesce(Economics.total_investment, 0) + total_investment,
+            Economics.current_value: func.coalesce(Economics.current_value, 0) + current_value,
+        },
+        synchronize_session=False,
+    )
+
+
+def add_share_to_economics(db: Session, share):
+    apply_economics_delta(db, share.member_id, 1, share.initial_value, share.current_value or 0)
+
+
+def remove_share_from_economics(db: Session, share):
+    apply_economics_delta(db, share.member_id, -1, -share.initial_value, -(share.current_value or 0))
@@ -1,11 +1,12 @@
 # pylint: disable=singleton-comparison,W0622
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from solarpark.models.error_log import ErrorLogCreateRequest, ErrorLogUpdateRequest
+from solarpark.persistence.counts import TotalCount, count_rows
 from solarpark.persistence.models.error_log import ErrorLog
+from solarpark.persistence.pagination import get_page
 
 
 def get_error(db: Session, error_id: int):
@@ -18,30 +19,12 @@ def get_error_by_list_ids(db: Session, error_ids: list):
     return {"data": result, "total": len(result)}
 
 
-def get_all_errors(db: Session, sort: List, range: List) -> Dict:
-    total_count = db.query(ErrorLog).count()
-
-    # Pagination and sort order
-    if len(range) == 2 and len(sort) == 2:
-        return {
-            "data": db.query(ErrorLog)
-            .order_by(text(f"{sort[0]} {sort[1].lower()}"))
-            .offset(range[0])
-            .limit(range[1])
-            .all(),
-            "total": total_count,
-        }
-
-    # Pagination only
-    if len(range) == 2:
-        return {
-            "data": db.query(ErrorLog).order_by(ErrorLog.id).offset(range[0]).limit(range[1]).all(),
-            "total": total_count,
-        }
-    return {
-        "data": db.query(ErrorLog).order_by(ErrorLog.id).offset(0).limit(10).all(),
-        "total": total_count,
-    }
+def get_all_errors(
+    db: Session, sort: List, range: List, cursor: Optional[str] = None, total: TotalCount = TotalCount.EXACT
+) -> Dict:
+    total_count = count_rows(db, ErrorLog, total)
+
+    return {**get_page(db.query(ErrorLog), ErrorLog, sort, range, cursor), "total": total_count}
 
 
 def update_error(db: Session, error_id: int, error_update: ErrorLogUpdateRequest):
@@ -60,6 +43,14 @@ def delete_error(db: Session, error_id: int):
 
 
 def create_error(db: Session, error_request: ErrorLogCreateRequest):
+    add_error(db, error_request)
+    db.commit()
+
+
+def add_error(db: Session, error_request: ErrorLogCreateRequest):
+    """
+    Add the error to the session's current transaction without committing it.
+    """
     error = ErrorLog(
         member_id=error_request.member_id,
         share_id=error_request.share_id,
@@ -67,7 +58,6 @@ def create_error(db: Session, error_request: ErrorLogCreateRequest):
         resolved=error_request.resolved,
     )
     db.add(error)
-    db.commit()
 
 
 def get_all_unresolved_errors(db: Session):
@@ -1,34 +1,26 @@
 # pylint: disable=W0511, R0914,  W0622
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from solarpark.api.send_email import send_summary_and_certificate_with_loopia
-from solarpark.models.economics import EconomicsCreateRequest, EconomicsUpdateRequest
+from solarpark.models.economics import EconomicsCreateRequest
 from solarpark.models.leads import LeadCreateRequest, LeadUpdateRequest
 from solarpark.models.members import MemberCreateRequest
 from solarpark.models.shares import ShareCreateRequest
-from solarpark.persistence.economics import create_economics, get_economics_by_member, update_economics
+from solarpark.persistence.counts import TotalCount, count_rows
+from solarpark.persistence.economics import create_economics
 from solarpark.persistence.members import create_member
 from solarpark.persistence.models.leads import Lead
+from solarpark.persistence.pagination import get_page
+from solarpark.persistence.search import search
 from solarpark.persistence.shares import create_share
 from solarpark.services import loopia_client
 from solarpark.settings import settings
 
 
 def find_lead(db: Session, term: str):
-    result = (
-        db.query(Lead)
-        .filter(
-            Lead.firstname.ilike(f"%{term}%")
-            | Lead.lastname.ilike(f"%{term}%")
-            | Lead.org_name.ilike(f"%{term}%")
-            | Lead.email.ilike(f"%{term}%")
-        )
-        .all()
-    )
-    return {"data": result, "total": len(result)}
+    return search(db, Lead, [Lead.firstname, Lead.lastname, Lead.org_name, Lead.email], term)
 
 
 def get_lead(db: Session, lead_id: int):
@@ -45,31 +37,12 @@ def count_all_leads(db: Session):
     return db.query(Lead).count()
 
 
-def get_all_leads(db: Session, sort: List, range: List) -> Dict:
-    total_count = db.query(Lead).count()
-
-    # Pagination and sort order
-    if len(range) == 2 and len(sort) == 2:
-        return {
-            "data": db.query(Lead)
-            .order_by(text(f"{sort[0]} {sort[1].lower()}"))
-            .offset(range[0])
-            .limit(range[1])
-            .all(),
-            "total": total_count,
-        }
+def get_all_leads(
+    db: Session, sort: List, range: List, cursor: Optional[str] = None, total: TotalCount = TotalCount.EXACT
+) -> Dict:
+    total_count = count_rows(db, Lead, total)
 
-    # Pagination only
-    if len(range) == 2:
-        return {
-            "data": db.query(Lead).order_by(Lead.id).offset(range[0]).limit(range[1]).all(),
-            "total": total_count,
-        }
-
-    return {
-        "data": db.query(Lead).order_by(Lead.id).offset(0).limit(10).all(),
-        "total": total_count,
-    }
+    return {**get_page(db.query(Lead), Lead, sort, range, cursor), "total": total_count}
 
 
 def delete_lead(db: Session, lead_id):
@@ -134,27 +107,10 @@ def approve_lead(db: Session, lead_id: int, approved: bool, comment: str):
             initial_value=settings.SHARE_PRICE,
             from_internal_account=False,
         )
+        # create_share adds every share to the member's economics
         for _ in range(lead.quantity_shares):
             create_share(db=db, share_request=share_request)
 
-        member = get_economics_by_member(db, existing_member_id)["data"][0]
-        nr_of_shares = member.nr_of_shares + lead.quantity_shares
-        total_investment = member.total_investment + lead.quantity_shares * settings.SHARE_PRICE
-        current_value = member.current_value + lead.quantity_shares * settings.SHARE_PRICE
-
-        member_update_request = EconomicsUpdateRequest(
-            nr_of_shares=nr_of_shares,
-            total_investment=total_investment,
-            current_value=current_value,
-            reinvested=member.reinvested,
-            account_balance=member.account_balance,
-            pay_out=member.pay_out,
-            disbursed=member.disbursed,
-            last_dividend_year=member.last_dividend_year,
-            issued_dividend=member.issued_dividend,
-        )
-
-        update_economics(db, member.id, member_update_request)
         if lead.generate_certificate:
             send_summary_and_certificate_with_loopia(loopia_client(), db, existing_member_id)
 
@@ -186,6 +142,7 @@ def approve_lead(db: Session, lead_id: int, approved: bool, comment: str):
     for _ in range(lead.quantity_shares):
         create_share(db=db, share_request=share_request)
 
+    # The new member has no economics for create_share to add to yet, it starts with the totals of the new shares
     member_create_request = EconomicsCreateRequest(
         member_id=new_member_id,
         nr_of_shares=lead.quantity_shares,
@@ -0,0 +1,28 @@
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+
+class MemberIdsError(ValueError):
+    """
+    A member_id filter that is not a flat list of integers.
+    """
+
+
+def get_by_member_ids(db: Session, model, member_ids: List[int]) -> Dict:
+    """
+    The rows of the model belonging to any of the members, fetched with one IN query and ordered by member. by_member
+    maps every requested member to the ids of its rows, an empty list when it has none. Raises MemberIdsError when
+    any member id is not an integer.
+    """
+    invalid = [member_id for member_id in member_ids if not isinstance(member_id, int) or isinstance(member_id, bool)]
+    if invalid:
+        raise MemberIdsError(f"member_id must be a list of integers, got {invalid}")
+
+    member_ids = list(dict.fromkeys(member_ids))
+    result = db.query(model).filter(model.member_id.in_(member_ids)).order_by(model.member_id, model.id).all()
+
+    by_member: Dict[int, List[int]] = {member_id: [] for member_id in member_ids}
+    for row in result:
+        by_member[row.member_id].append(row.id)
+    return {"data": result, "total": len(result), "by_member": by_member}
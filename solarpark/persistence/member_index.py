@@ -0,0 +1,170 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from solarpark.persistence.models.members import Member
+from solarpark.settings import settings
+
+# Columns of a member kept in memory and returned as suggestions
+INDEXED_COLUMNS = ("id", "firstname", "lastname", "org_name", "email")
+
+
+def member_keys(member: Dict) -> List[str]:
+    """
+    The lowercased strings a member can be found by the start of: member number, first name, last name, full name,
+    organization name and email.
+    """
+    full_name = " ".join(name for name in (member["firstname"], member["lastname"]) if name)
+    keys = [str(member["id"]), member["firstname"], member["lastname"], full_name, member["org_name"], member["email"]]
+    return sorted({key.strip().lower() for key in keys if key and key.strip()})
+
+
+class MemberIndex:
+    """
+    Sorted array of (key, member id) pairs over all members of one database, searched for prefixes with bisect.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple[str, int]] = []
+        self.members: Dict[int, Dict] = {}
+        self.built_at: Optional[float] = None
+        self.lock = threading.Lock()
+        # Set once the first build is in place
+        self.ready = threading.Event()
+        self.first_build_lock = threading.Lock()
+        # Puts and removes made while a build is reading the members, replayed onto its result. None when no
+        # build is running.
+        self.changes: Optional[List[Tuple[int, Optional[Dict]]]] = None
+
+    def start_build(self) -> bool:
+        """
+        Reserve the next build, False when one is already running.
+        """
+        with self.lock:
+            if self.changes is not None:
+                return False
+            self.changes = []
+            return True
+
+    def build(self, db: Session):
+        """
+        Read all members and swap in the new entries, after a successful start_build. The current entries are
+        served until then, and the puts and removes made meanwhile are applied again on the new ones, since the
+        members read may predate them.
+        """
+        try:
+            members = {row.id: row._asdict() for row in db.query(*(getattr(Member, name) for name in INDEXED_COLUMNS))}
+            entries = sorted((key, member_id) for member_id, member in members.items() for key in member_keys(member))
+            with self.lock:
+                self.members, self.entries, self.built_at = members, entries, time.monotonic()
+                for member_id, member in self.changes:
+                    self._remove(member_id)
+                    if member is not None:
+                        self._insert(member)
+            self.ready.set()
+        finally:
+            with self.lock:
+                self.changes = None
+
+    def build_in_background(self, bind: Engine):
+        def build():
+            with Session(bind=bind) as db:
+                self.build(db)
+
+        threading.Thread(target=build, name="member-index-build", daemon=True).start()
+
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > settings.MEMBER_INDEX_MAX_AGE
+
+    def _remove(self, member_id: int):
+        member = self.members.pop(member_id, None)
+        if member is None:
+            return
+        for key in member_keys(member):
+            position = bisect_left(self.entries, (key, member_id))
+            if position < len(self.entries) and self.entries[position] == (key, member_id):
+                del self.entries[position]
+
+    def _insert(self, member: Dict):
+        self.members[member["id"]] = member
+        for key in member_keys(member):
+            insort(self.entries, (key, member["id"]))
+
+    def put(self, member):
+        member = {name: getattr(member, name) for name in INDEXED_COLUMNS}
+        with self.lock:
+            self._remove(member["id"])
+            self._insert(member)
+            if self.changes is not None:
+                self.changes.append((member["id"], member))
+
+    def remove(self, member_id: int):
+        with self.lock:
+            self._remove(member_id)
+            if self.changes is not None:
+                self.changes.append((member_id, None))
+
+    def complete(self, prefix: str, limit: int) -> List[Dict]:
+        """
+        Members with a key starting with the prefix, ordered by the first such key, at most limit of them.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+
+        result = {}
+        with self.lock:
+            position = bisect_left(self.entries, (prefix,))
+            while position < len(self.entries) and len(result) < limit:
+                key, member_id = self.entries[position]
+                if not key.startswith(prefix):
+                    break
+                result.setdefault(member_id, self.members[member_id])
+                position += 1
+        return list(result.values())
+
+
+# One index per database, built on first use and again once older than MEMBER_INDEX_MAX_AGE, which picks up members
+# written by other processes
+_indexes: Dict[str, MemberIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_member_index(db: Session) -> MemberIndex:
+    """
+    The index of the database. The first use builds it, other requests wait for that build. A stale index is
+    rebuilt in a background thread, one build at a time, and served as it is until the new one is in place.
+    """
+    database = db.get_bind().url.render_as_string(hide_password=True)
+    with _indexes_lock:
+        index = _indexes.setdefault(database, MemberIndex())
+    if not index.ready.is_set():
+        # Nothing to serve until the first build, made by one request at a time
+        with index.first_build_lock:
+            if not index.ready.is_set() and index.start_build():
+                index.build(db)
+    elif index.is_stale() and index.start_build():
+        index.build_in_background(db.get_bind())
+    return index
+
+
+def index_member(db: Session, member):
+    """
+    Add or replace the member in the index of its database, after the member is committed.
+    """
+    if member is not None:
+        get_member_index(db).put(member)
+
+
+def unindex_member(db: Session, member_id: int):
+    get_member_index(db).remove(member_id)
+
+
+def autocomplete_members(db: Session, prefix: str, limit: Optional[int] = None) -> Dict:
+    limit = min(limit or settings.AUTOCOMPLETE_LIMIT, settings.AUTOCOMPLETE_LIMIT)
+    result = get_member_index(db).complete(prefix, limit)
+    return {"data": result, "total": len(result)}
@@ -1,34 +1,21 @@
 # pylint: disable=singleton-comparison,W0622
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from sqlalchemy import and_, text
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, selectinload
 
 from solarpark.models.members import MemberCreateRequest, MemberUpdateRequest
+from solarpark.persistence.analytics_deltas import apply_yearly_deltas, member_deltas
+from solarpark.persistence.counts import TotalCount, count_rows
+from solarpark.persistence.member_index import index_member, unindex_member
 from solarpark.persistence.models.members import Member
+from solarpark.persistence.pagination import get_page
+from solarpark.persistence.search import search
+from solarpark.persistence.streaming import stream_rows, stream_rows_in_batches
 
 
 def find_member(db: Session, term: str):
-    split_term = term.split(" ")
-
-    if len(split_term) == 2:
-        result = (
-            db.query(Member)
-            .filter(and_(Member.firstname.ilike(f"%{split_term[0]}%"), Member.lastname.ilike(f"%{split_term[1]}%")))
-            .all()
-        )
-    else:
-        result = (
-            db.query(Member)
-            .filter(
-                Member.firstname.ilike(f"%{term}%")
-                | Member.lastname.ilike(f"%{term}%")
-                | Member.org_name.ilike(f"%{term}%")
-                | Member.email.ilike(f"%{term}%")
-            )
-            .all()
-        )
-    return {"data": result, "total": len(result)}
+    return search(db, Member, [Member.firstname, Member.lastname, Member.org_name, Member.email], term)
 
 
 def get_member(db: Session, member_id: int):
@@ -36,41 +23,38 @@ def get_member(db: Session, member_id: int):
     return {"data": result, "total": len(result)}
 
 
+def get_member_detail(db: Session, member_id: int):
+    """
+    The member with its economics, shares and payments, loaded with one query per relationship whatever their number.
+    """
+    return (
+        db.query(Member)
+        .options(selectinload(Member.economics), selectinload(Member.shares), selectinload(Member.payments))
+        .filter(Member.id == member_id)
+        .first()
+    )
+
+
 def get_member_by_list_ids(db: Session, member_ids: list):
     result = db.query(Member).filter(Member.id.in_(member_ids)).all()
     return {"data": result, "total": len(result)}
 
 
-def get_all_member_ids_and_emails(db: Session) -> List[Tuple[int, str]]:
-    results = db.query(Member.id, Member.email).all()
-    return [(row.id, row.email) for row in results]
+def stream_member_ids(db: Session) -> Iterator:
+    return stream_rows(db, select(Member.id).order_by(Member.id))
 
 
-def get_all_members(db: Session, sort: List, range: List) -> Dict:
-    total_count = db.query(Member).count()
+def stream_member_ids_and_emails(db: Session, batch_size: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    # Read in batches, the bulk email job takes seconds per member and must not hold a cursor open meanwhile
+    return stream_rows_in_batches(db, select(Member.id, Member.email), Member.id, batch_size)
 
-    # Pagination and sort order
-    if len(range) == 2 and len(sort) == 2:
-        return {
-            "data": db.query(Member)
-            .order_by(text(f"{sort[0]} {sort[1].lower()}"))
-            .offset(range[0])
-            .limit(range[1])
-            .all(),
-            "total": total_count,
-        }
 
-    # Pagination only
-    if len(range) == 2:
-        return {
-            "data": db.query(Member).order_by(Member.id).offset(range[0]).limit(range[1]).all(),
-            "total": total_count,
-        }
+def get_all_members(
+    db: Session, sort: List, range: List, cursor: Optional[str] = None, total: TotalCount = TotalCount.EXACT
+) -> Dict:
+    total_count = count_rows(db, Member, total)
 
-    return {
-        "data": db.query(Member).order_by(Member.id).offset(0).limit(10).all(),
-        "total": total_count,
-    }
+    return {**get_page(db.query(Member), Member, sort, range, cursor), "total": total_count}
 
 
 def count_all_members(db: Session, filter_on_org: bool = False):
@@ -80,15 +64,26 @@ def count_all_members(db: Session, filter_on_org: bool = False):
 
 
 def update_member(db: Session, member_id: int, member_update: MemberUpdateRequest):
+    member = db.query(Member.year, Member.created_at).filter(Member.id == member_id).first()
+    if member is not None:
+        apply_yearly_deltas(
+            db,
+            member_deltas([member], -1),
+            member_deltas([{"year": member_update.year, "created_at": member.created_at}]),
+        )
     db.query(Member).filter(Member.id == member_id).update(member_update.model_dump())
     db.commit()
-    return db.query(Member).filter(Member.id == member_id).first()
+    member = db.query(Member).filter(Member.id == member_id).first()
+    index_member(db, member)
+    return member
 
 
 def delete_member(db: Session, member_id: int) -> bool:
-    deleted = db.query(Member).filter(Member.id == member_id).delete()
-    if deleted == 1:
+    members = db.execute(delete(Member).where(Member.id == member_id).returning(Member.year, Member.created_at)).all()
+    if len(members) == 1:
+        apply_yearly_deltas(db, member_deltas(members, -1))
         db.commit()
+        unindex_member(db, member_id)
         return True
     return False
 
@@ -109,6 +104,8 @@ def create_member(db: Session, member_request: MemberCreateRequest):
         swish=member_request.swish,
     )
     db.add(member)
+    apply_yearly_deltas(db, member_deltas([member]))
     db.commit()
     db.refresh(member)
+    index_member(db, member)
     return member
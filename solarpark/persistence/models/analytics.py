@@ -0,0 +1,27 @@
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, func
+
+from solarpark.persistence.database import Base
+
+
+class AnalyticsSnapshot(Base):
+    __tablename__ = "analytics_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement="auto")
+    data = Column(JSON, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class AnalyticsYear(Base):
+    __tablename__ = "analytics_years"
+
+    year = Column(Integer, primary_key=True)
+    shares_bought = Column(Integer, nullable=False)
+    reinvested_shares = Column(Integer, nullable=False)
+    dividend_per_share = Column(Float, nullable=True)
+    nr_of_payouts = Column(Integer, nullable=False)
+    payout_amount = Column(Float, nullable=False)
+    new_members = Column(Integer, nullable=False)
+    total_members = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
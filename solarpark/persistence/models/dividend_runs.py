@@ -0,0 +1,28 @@
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, func
+
+from solarpark.persistence.database import Base
+
+
+class DividendRun(Base):
+    __tablename__ = "dividend_runs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement="auto")
+    parent_id = Column(Integer, ForeignKey("dividend_runs.id"), nullable=True, index=True)
+    payment_year = Column(Integer, nullable=False)
+    engine = Column(String, nullable=False)
+    is_historical_fulfillment = Column(Boolean, nullable=False)
+    status = Column(String, nullable=False)
+    last_economics_id = Column(Integer, nullable=False, default=0)
+    end_economics_id = Column(Integer, nullable=True)
+    total_economics = Column(Integer, nullable=True)
+    members_processed = Column(Integer, nullable=False, default=0)
+    members_skipped = Column(Integer, nullable=False, default=0)
+    members_failed = Column(Integer, nullable=False, default=0)
+    shares_created = Column(Integer, nullable=False, default=0)
+    payouts_created = Column(Integer, nullable=False, default=0)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    # When the run last entered running, on creation or resume, and how many members were done by then
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    members_done_at_start = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,6 +1,7 @@
 from sqlalchemy import Boolean, Column, DateTime, Integer, String, func
 
 from solarpark.persistence.database import Base
+from solarpark.persistence.search import trigram_index
 
 
 class Lead(Base):
@@ -23,3 +24,5 @@ class Lead(Base):
     purchased_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (trigram_index("ix_leads_search", firstname, lastname, org_name, email),)
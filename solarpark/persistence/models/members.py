@@ -1,6 +1,8 @@
 from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy.orm import relationship
 
 from solarpark.persistence.database import Base
+from solarpark.persistence.search import trigram_index
 
 
 class Member(Base):
@@ -21,3 +23,10 @@ class Member(Base):
     year = Column(DateTime, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships, read only since shares, economics and payments are written through their own member_id
+    economics = relationship("Economics", viewonly=True, order_by="Economics.id")
+    shares = relationship("Share", viewonly=True, order_by="Share.id")
+    payments = relationship("Payment", viewonly=True, order_by="Payment.id")
+
+    __table_args__ = (trigram_index("ix_members_search", firstname, lastname, org_name, email),)
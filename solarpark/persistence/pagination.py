@@ -0,0 +1,131 @@
+# pylint: disable=W0622
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import Boolean, DateTime, Integer, and_, cast, func, or_
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 10
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    """
+    Opaque cursor for the row a page ended on: its sort value and id.
+    """
+    if isinstance(sort_value, (date, datetime)):
+        sort_value = sort_value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str, column):
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as ex:
+        raise ValueError("invalid cursor") from ex
+
+    if sort_value is not None and column.type.python_type is datetime:
+        sort_value = datetime.fromisoformat(sort_value)
+    elif sort_value is not None and column.type.python_type is date:
+        sort_value = date.fromisoformat(sort_value)
+    return sort_value, row_id
+
+
+def sort_column(model, sort: List):
+    """
+    The model column and direction to sort on from a ["field", "ASC" | "DESC"] sort parameter, id ascending without one.
+    """
+    if len(sort) != 2:
+        return model.__table__.c.id, False
+
+    column = model.__table__.columns.get(sort[0])
+    if column is None or sort[1].lower() not in ("asc", "desc"):
+        raise ValueError(f"cannot sort on {sort[0]} {sort[1]}")
+    return column, sort[1].lower() == "desc"
+
+
+# SQLite keeps timestamps as text, with or without fractional seconds depending on whether the database or Python
+# wrote them. Reformatted the same way they sort and compare as timestamps.
+SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def sort_key(column, dialect: str):
+    """
+    The expression rows are ordered and compared on for the column. Booleans are compared as integers, since
+    SQLAlchemy has no ordering comparison for them.
+    """
+    if isinstance(column.type, Boolean):
+        return cast(column, Integer)
+    if isinstance(column.type, DateTime) and dialect == "sqlite":
+        return func.strftime(SQLITE_TIMESTAMP_FORMAT, column)
+    return column
+
+
+def sort_bound(column, sort_value, dialect: str):
+    """
+    The cursor's sort value in the form sort_key compares it in.
+    """
+    if isinstance(column.type, Boolean):
+        return int(sort_value)
+    if isinstance(column.type, DateTime) and dialect == "sqlite":
+        return func.strftime(SQLITE_TIMESTAMP_FORMAT, sort_value.replace(tzinfo=None).isoformat(sep=" "))
+    return sort_value
+
+
+def order_by_sort(model, column, descending: bool, dialect: str) -> List:
+    # Rows are ordered on (sort value, id) so that ties have a stable order, NULL sort values come first on every
+    # database
+    row_id = model.__table__.c.id
+    key = sort_key(column, dialect)
+    order = [column.is_not(None), key, row_id] if column.nullable else [key, row_id]
+    return [term.desc() for term in order] if descending else order
+
+
+def after_cursor(model, column, descending: bool, sort_value, row_id: int, dialect: str):
+    """
+    Filter on the rows that come after (sort_value, row_id) in the order of order_by_sort.
+    """
+    id_column = model.__table__.c.id
+    after_id = id_column < row_id if descending else id_column > row_id
+    if column is id_column:
+        return after_id
+
+    if sort_value is None:
+        after_null = and_(column.is_(None), after_id)
+        return after_null if descending else or_(after_null, column.is_not(None))
+
+    key, bound = sort_key(column, dialect), sort_bound(column, sort_value, dialect)
+    if descending:
+        after_value = or_(key < bound, and_(key == bound, after_id))
+    else:
+        after_value = or_(key > bound, and_(key == bound, after_id))
+    if not column.nullable:
+        return after_value
+    return or_(column.is_(None), after_value) if descending else and_(column.is_not(None), after_value)
+
+
+def get_page(query: Query, model, sort: List, range: List, cursor: Optional[str] = None) -> Dict:
+    """
+    A page of the query's rows in the order given by sort, with next_cursor pointing after the last row when the
+    page is full. With a cursor the page starts after the row it points to and range only gives the page size, so
+    deep pages cost as much as the first. Without one range is [offset, limit] as before.
+    """
+    column, descending = sort_column(model, sort)
+    limit = range[1] if len(range) == 2 else DEFAULT_PAGE_SIZE
+
+    dialect = query.session.get_bind().dialect.name
+    query = query.order_by(*order_by_sort(model, column, descending, dialect))
+    if cursor is not None:
+        sort_value, row_id = decode_cursor(cursor, column)
+        query = query.filter(after_cursor(model, column, descending, sort_value, row_id, dialect))
+    elif len(range) == 2:
+        query = query.offset(range[0])
+
+    result = query.limit(limit).all()
+
+    next_cursor = None
+    if result and len(result) == limit:
+        next_cursor = encode_cursor(getattr(result[-1], column.key), result[-1].id)
+    return {"data": result, "next_cursor": next_cursor}
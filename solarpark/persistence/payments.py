@@ -2,13 +2,17 @@
 
 
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sqlalchemy import func, text
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from solarpark.models.payments import PaymentCreateRequest, PaymentUpdateRequest
+from solarpark.persistence.analytics_deltas import apply_yearly_deltas, payment_deltas
+from solarpark.persistence.counts import TotalCount, count_rows
+from solarpark.persistence.lookups import get_by_member_ids
 from solarpark.persistence.models.payments import Payment
+from solarpark.persistence.pagination import get_page
 
 
 def create_payment(db: Session, payment_request: PaymentCreateRequest):
@@ -19,6 +23,7 @@ def create_payment(db: Session, payment_request: PaymentCreateRequest):
         paid_out=payment_request.paid_out,
     )
     db.add(payment)
+    apply_yearly_deltas(db, payment_deltas([payment]))
     db.commit()
     db.refresh(payment)
     return payment
@@ -39,48 +44,37 @@ def get_payment_by_member_id(db: Session, member_id: int):
     return {"data": result, "total": len(result)}
 
 
+def get_payments_by_member_list(db: Session, member_ids: List[int]):
+    return get_by_member_ids(db, Payment, member_ids)
+
+
 def get_payments_by_year(db: Session, payment_year: int):
     result = db.query(Payment).filter(Payment.year == payment_year).all()
     return {"data": result, "total": len(result)}
 
 
 def update_payment_id(db: Session, payment_id: int, payment_update: PaymentUpdateRequest):
+    payment = db.query(Payment.year, Payment.amount).filter(Payment.id == payment_id).first()
+    if payment is not None:
+        apply_yearly_deltas(db, payment_deltas([payment], -1), payment_deltas([payment_update]))
     db.query(Payment).filter(Payment.id == payment_id).update(payment_update.model_dump())
     db.commit()
     return db.query(Payment).filter(Payment.id == payment_id).first()
 
 
-def get_all_payments(db: Session, sort: List, range: List) -> Dict:
-    total_count = db.query(Payment).count()
-
-    # Pagination and sort order
-    if len(range) == 2 and len(sort) == 2:
-        return {
-            "data": db.query(Payment)
-            .order_by(text(f"{sort[0]} {sort[1].lower()}"))
-            .offset(range[0])
-            .limit(range[1])
-            .all(),
-            "total": total_count,
-        }  # noqa: E731
-
-    # Pagination only
-    if len(range) == 2:
-        return {
-            "data": db.query(Payment).order_by(Payment.id).offset(range[0]).limit(range[1]).all(),
-            "total": total_count,
-        }
+def get_all_payments(
+    db: Session, sort: List, range: List, cursor: Optional[str] = None, total: TotalCount = TotalCount.EXACT
+) -> Dict:
+    total_count = count_rows(db, Payment, total)
 
-    return {
-        "data": db.query(Payment).order_by(Payment.id).offset(0).limit(10).all(),
-        "total": total_count,
-    }
+    return {**get_page(db.query(Payment), Payment, sort, range, cursor), "total": total_count}
 
 
 def delete_payment(db: Session, payment_id: int):
     payment = db.query(Payment).filter(Payment.id == payment_id).first()
     deleted = db.query(Payment).filter(Payment.id == payment_id).delete()
     if deleted == 1:
+        apply_yearly_deltas(db, payment_deltas([payment], -1))
         db.commit()
         return payment
     return False
@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import DDL, Connection, Index, Integer, event, func, literal_column
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from solarpark.persistence.database import Base
+from solarpark.settings import settings
+
+# The trigram indexes need the pg_trgm extension
+CREATE_TRIGRAM_EXTENSION = DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+event.listen(Base.metadata, "before_create", CREATE_TRIGRAM_EXTENSION.execute_if(dialect="postgresql"))
+
+# Every index made by trigram_index
+TRIGRAM_INDEXES: List[Index] = []
+
+
+def search_document(*columns):
+    """
+    The lowercased text of the columns joined by spaces. Searches filter on this expression and the trigram indexes are
+    built on exactly the same one, so that PostgreSQL can use them.
+    """
+    # Inline literals rather than bound parameters, so that queries spell the expression exactly as the index does
+    empty, space = literal_column("''"), literal_column("' '")
+    document = func.coalesce(columns[0], empty)
+    for column in columns[1:]:
+        document = document.concat(space).concat(func.coalesce(column, empty))
+    return func.lower(document)
+
+
+def trigram_index(name: str, *columns) -> Index:
+    """
+    GIN trigram index on the search document of the columns, which serves LIKE '%term%' filters. Only created on
+    PostgreSQL.
+    """
+    label = f"{name}_document"
+    index = Index(
+        name,
+        search_document(*columns).label(label),
+        postgresql_using="gin",
+        postgresql_ops={label: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+    TRIGRAM_INDEXES.append(index)
+    return index
+
+
+def create_trigram_indexes(connection: Connection):
+    """
+    Create the pg_trgm extension and the trigram indexes where missing. create_all only creates indexes together
+    with a new table, this also adds them to tables that existed before. Only does anything on PostgreSQL.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+
+    connection.execute(CREATE_TRIGRAM_EXTENSION)
+    for index in TRIGRAM_INDEXES:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def contains_pattern(word: str) -> str:
+    """
+    LIKE pattern for the word anywhere in the text, escaped with "/". A whole pattern rather than
+    '%' || word || '%' keeps it a constant the trigram index can be searched with.
+    """
+    escaped = word.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
+def search(db: Session, model, columns: List, term: str, limit: Optional[int] = None) -> Dict:
+    """
+    Rows where every word of the term is found in one of the columns, best matches first and at most limit of them
+    (SEARCH_LIMIT by default). PostgreSQL ranks on trigram word similarity to the whole term, other databases on the
+    number of columns that start with one of the words.
+    """
+    words = term.lower().split()
+    if not words:
+        return {"data": [], "total": 0}
+
+    document = search_document(*columns)
+    query = db.query(model).filter(*[document.like(contains_pattern(word), escape="/") for word in words])
+
+    if db.get_bind().dialect.name == "postgresql":
+        rank = func.word_similarity(" ".join(words), document)
+    else:
+        rank = sum(
+            func.lower(func.coalesce(column, "")).startswith(word, autoescape=True).cast(Integer)
+            for column in columns
+            for word in words
+        )
+
+    result = query.order_by(rank.desc(), model.id).limit(limit or settings.SEARCH_LIMIT).all()
+    return {"data": result, "total": len(result)}
@@ -0,0 +1,32 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.shares import Share
+
+# Tables whose ids are handed out in order and are renumbered to continue after the highest id left after deletions
+COMPACTED_MODELS = (Member, Share)
+
+
+def compact_sequences(db: Session, models: Iterable = COMPACTED_MODELS) -> Dict[str, int]:
+    """
+    Restart the id sequence of each model's table right after its highest remaining id, so that the next insert
+    reuses the ids freed by deletions at the end of the table. Meant to run once after a batch of deletions instead
+    of after every delete, since restarting a sequence locks it against concurrent inserts. Returns the next id of
+    every table. Only PostgreSQL has sequences to restart, other databases already continue after the highest id.
+    """
+    next_ids = {}
+    for model in models:
+        table = model.__table__.name
+        next_id = (db.query(func.max(model.id)).scalar() or 0) + 1
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(
+                text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :next_id, false)"),
+                {"table": table, "next_id": next_id},
+            )
+        next_ids[table] = next_id
+
+    db.commit()
+    return next_ids
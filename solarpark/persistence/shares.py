@@ -1,48 +1,39 @@
 # pylint: disable=singleton-comparison,W0622,R0911
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sqlalchemy import extract, func, text
+from sqlalchemy import and_, case, delete, extract, func
 from sqlalchemy.orm import Session
 
-from solarpark.models.economics import EconomicsUpdateRequest
 from solarpark.models.error_log import ErrorLogCreateRequest
-from solarpark.models.shares import ShareCreateRequest, ShareCreateRequestImport, ShareUpdateRequest
-from solarpark.persistence.economics import get_economics_by_member, update_economics
+from solarpark.models.shares import (
+    ShareCreateRequest,
+    ShareCreateRequestImport,
+    ShareTransferRequest,
+    ShareUpdateRequest,
+)
+from solarpark.persistence.analytics_deltas import apply_yearly_deltas, share_deltas
+from solarpark.persistence.counts import TotalCount, count_rows
+from solarpark.persistence.economics_deltas import (
+    add_share_to_economics,
+    apply_economics_delta,
+    remove_share_from_economics,
+)
 from solarpark.persistence.error_log import create_error
+from solarpark.persistence.lookups import get_by_member_ids
 from solarpark.persistence.models.economics import Economics
 from solarpark.persistence.models.members import Member
 from solarpark.persistence.models.shares import Share
+from solarpark.persistence.pagination import get_page
 from solarpark.settings import settings
 
 
-def get_all_shares(db: Session, sort: List, range: List) -> Dict:
-    # return db.query(Share).all()
-    total_count = db.query(Share).count()
-    # pages = math.ceil(int(total_count) / per_page)
+def get_all_shares(
+    db: Session, sort: List, range: List, cursor: Optional[str] = None, total: TotalCount = TotalCount.EXACT
+) -> Dict:
+    total_count = count_rows(db, Share, total)
 
-    # Pagination and sort order
-    if len(range) == 2 and len(sort) == 2:
-        return {
-            "data": db.query(Share)
-            .order_by(text(f"{sort[0]} {sort[1].lower()}"))
-            .offset(range[0])
-            .limit(range[1])
-            .all(),
-            "total": total_count,
-        }
-
-    # Pagination only
-    if len(range) == 2:
-        return {
-            "data": db.query(Share).order_by(Share.id).offset(range[0]).limit(range[1]).all(),
-            "total": total_count,
-        }
-
-    return {
-        "data": db.query(Share).order_by(Share.id).offset(0).limit(10).all(),
-        "total": total_count,
-    }
+    return {**get_page(db.query(Share), Share, sort, range, cursor), "total": total_count}
 
 
 def get_share(db: Session, share_id: int):
@@ -60,6 +51,20 @@ def get_shares_by_member(db: Session, member_id: int):
     return {"data": result, "total": len(result)}
 
 
+def get_shares_by_member_list(db: Session, member_ids: List[int]):
+    return get_by_member_ids(db, Share, member_ids)
+
+
+def get_shares_grouped_by_member(db: Session, member_ids: list) -> Dict[int, Dict]:
+    """
+    The shares of every member, each member's in its own {"data", "total"}, fetched with one IN query.
+    """
+    shares_by_member: Dict[int, List[Share]] = {member_id: [] for member_id in member_ids}
+    for share in db.query(Share).filter(Share.member_id.in_(member_ids)).all():
+        shares_by_member[share.member_id].append(share)
+    return {member_id: {"data": shares, "total": len(shares)} for member_id, shares in shares_by_member.items()}
+
+
 def get_shares_by_member_and_purchase_year(db: Session, member_id: int, year: int):
     result = (
         db.query(Share).filter(Share.member_id == member_id).filter(extract("year", Share.purchased_at) < year).all()
@@ -107,9 +112,50 @@ def all_members_with_shares(db: Session):
     return all_with_shares, org_with_shares
 
 
+def get_share_statistics(db: Session) -> Dict:
+    """
+    The counters of count_all_shares and all_members_with_shares from one pass over the shares, grouped per member
+    and joined to members, using conditional aggregates.
+    """
+    shares_per_member = (
+        db.query(
+            Share.member_id.label("member_id"),
+            func.count(Share.id).label("nr_of_shares"),
+            func.sum(case((Share.from_internal_account.is_(True), 1), else_=0)).label("nr_of_reinvested"),
+        )
+        .group_by(Share.member_id)
+        .subquery()
+    )
+    is_solarpark = shares_per_member.c.member_id == settings.SOLARPARK_MEMBER_ID
+    member_with_shares = and_(Member.id != None, Member.id != settings.SOLARPARK_MEMBER_ID)  # noqa: E711
+    organization_with_shares = and_(member_with_shares, Member.org_name != None)  # noqa: E711
+
+    statistics = (
+        db.query(
+            func.sum(case((is_solarpark, 0), else_=shares_per_member.c.nr_of_shares)).label("all_shares"),
+            func.sum(case((is_solarpark, shares_per_member.c.nr_of_shares), else_=0)).label("all_solarpark_shares"),
+            func.sum(shares_per_member.c.nr_of_reinvested).label("reinvested_shares"),
+            func.sum(case((and_(organization_with_shares, shares_per_member.c.nr_of_shares > 1), 1), else_=0)).label(
+                "org_more_than_one_share"
+            ),
+            func.sum(case((member_with_shares, 1), else_=0)).label("all_with_shares"),
+            func.sum(case((organization_with_shares, 1), else_=0)).label("org_with_shares"),
+        )
+        .select_from(shares_per_member)
+        .outerjoin(Member, Member.id == shares_per_member.c.member_id)
+        .one()
+    )
+
+    # Sums over no shares at all are NULL
+    return {name: value or 0 for name, value in statistics._asdict().items()}
+
+
 def delete_shares_by_member(db: Session, member_id: int):
-    deleted = db.query(Share).filter(Share.member_id == member_id).delete()
-    if deleted == 1:
+    shares = db.execute(
+        delete(Share).where(Share.member_id == member_id).returning(Share.purchased_at, Share.from_internal_account)
+    ).all()
+    apply_yearly_deltas(db, share_deltas(shares, -1))
+    if len(shares) == 1:
         db.commit()
         return True
     return False
@@ -126,6 +172,8 @@ def create_share_import(db: Session, share_request: ShareCreateRequestImport):
         from_internal_account=share_request.from_internal_account,
     )
     db.add(share)
+    add_share_to_economics(db, share)
+    apply_yearly_deltas(db, share_deltas([share]))
     db.commit()
     db.refresh(share)
     return share
@@ -141,94 +189,93 @@ def create_share(db: Session, share_request: ShareCreateRequest):
         from_internal_account=False,
     )
     db.add(share)
+    add_share_to_economics(db, share)
+    apply_yearly_deltas(db, share_deltas([share]))
     db.commit()
     db.refresh(share)
     return share
 
 
 def update_share(db: Session, share_id: int, share_update: ShareUpdateRequest):
+    share = db.query(Share).filter(Share.id == share_id).first()
+    if share is None:
+        return None
+
+    # The initial value cannot be updated, only the owner and the current value
+    value_change = share_update.current_value - (share.current_value or 0)
+    if share.member_id == share_update.member_id:
+        apply_economics_delta(db, share.member_id, current_value=value_change)
+    else:
+        remove_share_from_economics(db, share)
+        apply_economics_delta(db, share_update.member_id, 1, share.initial_value, share_update.current_value)
+    # Moves the share to another year of the rollups when its purchase year or origin changes
+    apply_yearly_deltas(db, share_deltas([share], -1), share_deltas([share_update]))
 
-    share_before_update = get_share(db, share_id)
+    db.query(Share).filter(Share.id == share_id).update(share_update.model_dump(), synchronize_session=False)
+    db.commit()
 
-    if share_before_update["data"][0].member_id == share_update.member_id:
-        db.query(Share).filter(Share.id == share_id).update(share_update.model_dump())
-        db.commit()
-        return db.query(Share).filter(Share.id == share_id).first()
+    return db.query(Share).filter(Share.id == share_id).first()
 
-    members_id = [share_before_update["data"][0].member_id, share_update.member_id]
-    db.query(Share).filter(Share.id == share_id).update(share_update.model_dump())
-    db.commit()
 
-    for member_id in members_id:
-        shares = get_shares_by_member(db, member_id)
-        nr_of_shares = shares["total"]
-        total_investment = sum(share.initial_value for share in shares["data"])
-        current_value = sum(share.current_value for share in shares["data"])
-
-        if member_id == settings.SOLARPARK_MEMBER_ID:
-            continue
-
-        member = get_economics_by_member(db, member_id)["data"][0]
-        member_economics_request = EconomicsUpdateRequest(
-            nr_of_shares=nr_of_shares,
-            total_investment=total_investment,
-            current_value=current_value,
-            reinvested=member.reinvested,
-            account_balance=member.account_balance,
-            pay_out=member.pay_out,
-            disbursed=member.disbursed,
-            last_dividend_year=member.last_dividend_year,
-            issued_dividend=member.issued_dividend,
-        )
-        update_economics(db, member.id, member_economics_request)
+def transfer_shares(db: Session, transfer: ShareTransferRequest):
+    """
+    Move the shares to another member in one transaction. The economics of every member that gives or receives
+    shares is updated once with the total of the moved shares, instead of once per share. A receiving member without
+    economics is rejected, its shares would not be counted anywhere.
+    """
+    share_ids = set(transfer.share_ids)
+    if not share_ids:
+        raise ValueError("no shares to transfer")
+
+    shares = get_share_by_list_ids(db, list(share_ids))
+    if shares["total"] != len(share_ids):
+        missing = sorted(share_ids - {share.id for share in shares["data"]})
+        raise ValueError(f"shares {missing} not found")
+
+    moved = [share for share in shares["data"] if share.member_id != transfer.member_id]
+    if (
+        moved
+        and transfer.member_id != settings.SOLARPARK_MEMBER_ID
+        and not db.query(Economics.id).filter(Economics.member_id == transfer.member_id).first()
+    ):
+        raise ValueError(f"member {transfer.member_id} has no economics")
+
+    db.query(Share).filter(Share.id.in_(share_ids)).update(
+        {Share.member_id: transfer.member_id}, synchronize_session=False
+    )
 
-    return db.query(Share).filter(Share.id == share_id).first()
+    # Each giving member loses the sum of its moved shares and the receiving member gains all of them
+    for member_id in {share.member_id for share in moved}:
+        given = [share for share in moved if share.member_id == member_id]
+        apply_economics_delta(
+            db,
+            member_id,
+            -len(given),
+            -sum(share.initial_value for share in given),
+            -sum(share.current_value or 0 for share in given),
+        )
+    apply_economics_delta(
+        db,
+        transfer.member_id,
+        len(moved),
+        sum(share.initial_value for share in moved),
+        sum(share.current_value or 0 for share in moved),
+    )
 
+    db.commit()
 
-def delete_share(db: Session, share_id: int):
-    share = get_share(db, share_id)
-    if share and share["data"]:
-        member_id = share["data"][0].member_id
-    else:
-        return False
+    result = db.query(Share).filter(Share.id.in_(share_ids)).order_by(Share.id).all()
+    return {"data": result, "total": len(result)}
 
-    deleted = db.query(Share).filter(Share.id == share_id).delete()
-    if deleted != 1:
-        return False
 
-    if member_id == settings.SOLARPARK_MEMBER_ID:
-        try:
-            db.commit()
-            return True
-
-        except Exception as ex:
-            db.rollback()
-            error_request = ErrorLogCreateRequest(
-                share_id=share_id,
-                member_id=member_id,
-                comment=f"Error: no deleting of share {share_id}, details: {ex}",
-                resolved=False,
-            )
-            create_error(db, error_request)
-            return False
-
-    member = get_economics_by_member(db, member_id)
-    if not member or not member["data"][0]:
+def delete_share(db: Session, share_id: int):
+    # The deleted row comes back from the DELETE itself, there is no need to read it first
+    share = db.execute(delete(Share).where(Share.id == share_id).returning(*Share.__table__.columns)).first()
+    if share is None:
         return False
 
-    economics_update = EconomicsUpdateRequest(
-        nr_of_shares=member["data"][0].nr_of_shares - 1,
-        total_investment=member["data"][0].total_investment - share["data"][0].initial_value,
-        current_value=member["data"][0].current_value - share["data"][0].current_value,
-        reinvested=member["data"][0].reinvested,
-        account_balance=member["data"][0].account_balance,
-        pay_out=member["data"][0].pay_out,
-        disbursed=member["data"][0].disbursed,
-        last_dividend_year=member["data"][0].last_dividend_year,
-        issued_dividend=member["data"][0].issued_dividend,
-    )
-
-    db.query(Economics).filter(Economics.id == member["data"][0].id).update(economics_update.model_dump())
+    remove_share_from_economics(db, share)
+    apply_yearly_deltas(db, share_deltas([share], -1))
 
     try:
         db.commit()
@@ -236,25 +283,11 @@ def delete_share(db: Session, share_id: int):
         db.rollback()
         error_request = ErrorLogCreateRequest(
             share_id=share_id,
-            member_id=member_id,
+            member_id=share.member_id,
             comment=f"Error: no deleting of share {share_id}, details: {ex}",
             resolved=False,
         )
         create_error(db, error_request)
         return False
 
-    try:
-        last_item = db.query(Share).order_by(Share.id.desc()).first()
-        alter_sequence_query = f"ALTER SEQUENCE shares_id_seq RESTART WITH {last_item.id + 1}"
-        db.execute(text(alter_sequence_query))
-        db.commit()
-    except Exception as ex:
-        error_request = ErrorLogCreateRequest(
-            share_id=share_id,
-            member_id=member_id,
-            comment=f"Error resetting share sequence after deletion of share {share_id}, details: {ex}",
-            resolved=False,
-        )
-        create_error(db, error_request)
-
-    return share["data"][0]
+    return share
@@ -0,0 +1,45 @@
+from typing import Iterator, Optional
+
+from sqlalchemy import Row, Select
+from sqlalchemy.orm import Session
+
+from solarpark.settings import settings
+
+
+def stream_rows(db: Session, statement: Select, batch_size: Optional[int] = None) -> Iterator[Row]:
+    """
+    Iterate over the rows of the statement without loading them all. On PostgreSQL the rows come from a server-side
+    cursor, batch_size (STREAM_BATCH_SIZE by default) at a time, so memory stays constant and the first row arrives
+    as soon as the database has it.
+
+    The rows are read in a session of their own on a separate connection, so the caller can keep writing and
+    committing through db while iterating. SQLite would lock out those writes while a read is open, so there the
+    rows are fetched up front.
+    """
+    with Session(bind=db.get_bind()) as stream_db:
+        if stream_db.get_bind().dialect.name != "postgresql":
+            yield from stream_db.execute(statement).all()
+            return
+
+        result = stream_db.execute(statement, execution_options={"yield_per": batch_size or settings.STREAM_BATCH_SIZE})
+        yield from result
+
+
+def stream_rows_in_batches(db: Session, statement: Select, key, batch_size: Optional[int] = None) -> Iterator[Row]:
+    """
+    Iterate over the rows of the statement ordered by key, a unique column it selects, reading batch_size
+    (STREAM_BATCH_SIZE by default) rows at a time with WHERE key > last key ORDER BY key LIMIT batch_size. Every batch
+    is read in a short transaction of its own that has ended before its rows are handed out, so unlike stream_rows no
+    cursor or transaction stays open while the caller works through the rows, however long that takes.
+    """
+    batch_size = batch_size or settings.STREAM_BATCH_SIZE
+    last_key = None
+    while True:
+        batch_statement = statement if last_key is None else statement.where(key > last_key)
+        with Session(bind=db.get_bind()) as batch_db:
+            rows = batch_db.execute(batch_statement.order_by(key).limit(batch_size)).all()
+
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_key = getattr(rows[-1], key.key)
@@ -11,6 +11,16 @@ class Settings(BaseSettings):
     SHARE_PRICE: int = 3000
     ALLOW_ORIGINS: str
     ECONOMICS_BACKGROUND_BATCH: int = 20
+    DIVIDEND_BULK_INSERT: bool = True
+    DIVIDEND_PARALLELISM: int = 1
+    DIVIDEND_COMMIT_STRATEGY: str = "batch"
+    DIVIDEND_RUN_LEASE_SECONDS: int = 300
+    COUNT_CACHE_SECONDS: int = 60
+    ANALYTICS_SNAPSHOT_MAX_AGE: int = 300
+    SEARCH_LIMIT: int = 25
+    AUTOCOMPLETE_LIMIT: int = 10
+    MEMBER_INDEX_MAX_AGE: int = 300
+    STREAM_BATCH_SIZE: int = 1000
     SOLARPARK_MEMBER_ID: int = 1
 
     LOOPIA_EMAIL_FROM: str
@@ -25,6 +25,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from solarpark import persistence
 from solarpark.authentication import api_security
 from solarpark.persistence.database import Base, get_db
 from solarpark.setup import add_routes
@@ -82,3 +83,14 @@ def fixture() -> Fixture:
     app.dependency_overrides[BackgroundTasks] = fake_background_tasks
 
     return Fixture(client=client)
+
+
+@pytest.fixture
+def session_factory(monkeypatch, tmp_path) -> sessionmaker:
+    """Empty database for background jobs, which open their own sessions through SessionLocal"""
+    job_engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=job_engine)
+    job_session_local = sessionmaker(autocommit=False, autoflush=False, bind=job_engine)
+    monkeypatch.setattr(persistence, "SessionLocal", job_session_local)
+
+    return job_session_local
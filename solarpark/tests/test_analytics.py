@@ -0,0 +1,220 @@
+# pylint: disable=W0621
+
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from solarpark.models.dividends import DividendCreateRequest, DividendUpdateRequest
+from solarpark.models.members import MemberCreateRequest, MemberUpdateRequest
+from solarpark.models.payments import PaymentCreateRequest, PaymentUpdateRequest
+from solarpark.models.shares import ShareCreateRequest, ShareUpdateRequest
+from solarpark.persistence import delete_all_member_data
+from solarpark.persistence.analytics import (
+    claim_snapshot_refresh,
+    compute_analytics,
+    compute_yearly_rollups,
+    get_analytics_snapshot,
+    get_yearly_rollups,
+    refresh_analytics_snapshot_in_background,
+)
+from solarpark.persistence.dividends import create_dividend, delete_dividend, update_dividend
+from solarpark.persistence.members import create_member, delete_member, update_member
+from solarpark.persistence.models.dividends import Dividend
+from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.payments import Payment
+from solarpark.persistence.models.shares import Share
+from solarpark.persistence.payments import create_payment, delete_payment, update_payment_id
+from solarpark.persistence.shares import create_share, delete_share, update_share
+
+
+def add_member_with_shares(db, member_id: int, nr_of_shares: int):
+    db.add(Member(id=member_id, email=f"member{member_id}@test.com"))
+    for _ in range(nr_of_shares):
+        db.add(
+            Share(
+                member_id=member_id,
+                initial_value=3000,
+                current_value=3000,
+                purchased_at=datetime(2020, 1, 1),
+                from_internal_account=False,
+            )
+        )
+    db.add(
+        Economics(
+            member_id=member_id,
+            nr_of_shares=nr_of_shares,
+            account_balance=100,
+            disbursed=0,
+            last_dividend_year=2022,
+        )
+    )
+    db.commit()
+
+
+def test_analytics_snapshot_refreshed_after_writes(session_factory: sessionmaker):
+    statements = []
+
+    def count_statements(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+        statements.append(statement)
+
+    with session_factory() as db, session_factory() as other_db:
+        for member_id in [1, 2, 3]:
+            add_member_with_shares(db, member_id, nr_of_shares=member_id)
+
+        snapshot = get_analytics_snapshot(db)
+        assert snapshot.data == compute_analytics(db)
+        assert snapshot.data["shares"]["total_count"] == 5
+        assert not claim_snapshot_refresh(db, snapshot)
+
+        # Served from the snapshot without touching the analytics tables
+        event.listen(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        assert get_analytics_snapshot(other_db).data == snapshot.data
+        event.remove(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        assert statements and all("FROM shares" not in statement for statement in statements)
+
+        # After a write the stored snapshot is still served, one refresh is claimed for the background
+        add_member_with_shares(other_db, 4, nr_of_shares=2)
+        snapshot = get_analytics_snapshot(db)
+        assert snapshot.data["shares"]["total_count"] == 5
+        assert claim_snapshot_refresh(db, snapshot)
+        assert not claim_snapshot_refresh(other_db, snapshot)
+        refresh_analytics_snapshot_in_background(session_factory.kw["bind"])
+        db.expire_all()
+        snapshot = get_analytics_snapshot(db)
+        assert snapshot.data["shares"]["total_count"] == 7
+        assert not claim_snapshot_refresh(db, snapshot)
+
+        db.query(Economics).update({"account_balance": 0})
+        db.commit()
+        assert claim_snapshot_refresh(other_db, get_analytics_snapshot(other_db))
+        refresh_analytics_snapshot_in_background(session_factory.kw["bind"])
+        other_db.expire_all()
+        assert get_analytics_snapshot(other_db).data["economics"]["total_account_balance"] == 0
+
+        statements.clear()
+        event.listen(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        get_analytics_snapshot(db, fresh=True)
+        event.remove(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        assert any("FROM shares" in statement for statement in statements)
+
+
+def test_yearly_rollups(session_factory: sessionmaker):
+    with session_factory() as db:
+        for member_id, year in [(1, 2019), (2, 2019), (3, 2021)]:
+            db.add(Member(id=member_id, email=f"member{member_id}@test.com", year=datetime(year, 3, 1)))
+        for member_id, year, from_internal_account in [
+            (1, 2019, False),
+            (2, 2019, False),
+            (2, 2021, True),
+            (3, 2021, False),
+        ]:
+            db.add(
+                Share(
+                    member_id=member_id,
+                    initial_value=3000,
+                    current_value=3000,
+                    purchased_at=datetime(year, 6, 1),
+                    from_internal_account=from_internal_account,
+                )
+            )
+        db.add(Dividend(dividend_per_share=100, payment_year=2020, completed=True))
+        db.add(Dividend(dividend_per_share=200, payment_year=2021, completed=False))
+        db.add_all([Payment(member_id=1, year=2021, amount=150, paid_out=True) for _ in range(2)])
+        db.commit()
+
+        # A database written before the rollups were kept up to date is built on first read, without fresh
+        rollups = {row.year: row for row in get_yearly_rollups(db)["data"]}
+        assert sorted(rollups) == [2019, 2020, 2021]
+        assert [(rollups[year].shares_bought, rollups[year].reinvested_shares) for year in rollups] == [
+            (2, 0),
+            (0, 0),
+            (1, 1),
+        ]
+        assert [rollups[year].dividend_per_share for year in rollups] == [None, 100, None]
+        assert (rollups[2021].nr_of_payouts, rollups[2021].payout_amount) == (2, 300)
+        assert [(rollups[year].new_members, rollups[year].total_members) for year in rollups] == [
+            (2, 2),
+            (0, 2),
+            (1, 3),
+        ]
+
+        # Updated by a write, a range only reads its years
+        create_payment(db, PaymentCreateRequest(member_id=2, year=2022, amount=50, paid_out=False))
+        assert [(row.year, row.payout_amount) for row in get_yearly_rollups(db, from_year=2021)["data"]] == [
+            (2021, 300),
+            (2022, 50),
+        ]
+
+        # Removing rows written before the rollups were built counts them off the built years
+        delete_share(db, db.query(Share.id).filter(Share.member_id == 1).scalar())
+        delete_member(db, 3)
+        rollups = {row.year: row for row in get_yearly_rollups(db)["data"]}
+        assert (rollups[2019].shares_bought, rollups[2021].new_members, rollups[2021].total_members) == (1, 0, 2)
+
+
+def test_yearly_rollups_updated_by_writes(session_factory: sessionmaker):
+    with session_factory() as db:
+        members = [
+            create_member(db, MemberCreateRequest(email=f"member{year}@test.com", year=datetime(year, 3, 1)))
+            for year in [2019, 2020, 2021]
+        ]
+        update_member(db, members[1].id, MemberUpdateRequest(email=members[1].email, year=datetime(2018, 3, 1)))
+        delete_member(db, members[2].id)
+
+        shares = [
+            create_share(
+                db,
+                ShareCreateRequest(
+                    member_id=members[0].id,
+                    initial_value=3000,
+                    purchased_at=datetime(year, 6, 1),
+                    from_internal_account=False,
+                ),
+            )
+            for year in [2019, 2019, 2020]
+        ]
+        update_share(
+            db,
+            shares[1].id,
+            ShareUpdateRequest(
+                member_id=members[0].id,
+                current_value=3000,
+                purchased_at=datetime(2021, 6, 1),
+                from_internal_account=True,
+            ),
+        )
+        delete_share(db, shares[2].id)
+
+        payment = create_payment(
+            db, PaymentCreateRequest(member_id=members[0].id, year=2020, amount=100, paid_out=False)
+        )
+        create_payment(db, PaymentCreateRequest(member_id=members[1].id, year=2020, amount=50, paid_out=False))
+        update_payment_id(db, payment.id, PaymentUpdateRequest(year=2021, amount=120, paid_out=True))
+
+        dividend = create_dividend(
+            db, DividendCreateRequest(dividend_per_share=100, payment_year=2020, completed=False)
+        )
+        update_dividend(
+            db, dividend.id, DividendUpdateRequest(dividend_per_share=100, payment_year=2020, completed=True)
+        )
+        removed = create_dividend(db, DividendCreateRequest(dividend_per_share=50, payment_year=2021, completed=True))
+        delete_dividend(db, removed.id)
+
+        stored = {
+            row.year: {name: getattr(row, name) for name in compute_yearly_rollups(db)[2019]}
+            for row in get_yearly_rollups(db)["data"]
+        }
+        assert stored == compute_yearly_rollups(db)
+
+        # Removing everything leaves every year at zero
+        delete_payment(db, payment.id)
+        for member in members[:2]:
+            delete_all_member_data(db, member.id)
+        assert all(
+            not (
+                row.shares_bought or row.reinvested_shares or row.nr_of_payouts or row.new_members or row.total_members
+            )
+            for row in get_yearly_rollups(db)["data"]
+        )
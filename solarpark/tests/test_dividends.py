@@ -0,0 +1,520 @@
+# pylint: disable=W0621
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from solarpark import persistence
+from solarpark.models.dividend_runs import DividendRunCreateRequest
+from solarpark.models.dividends import DividendEngine
+from solarpark.persistence import (
+    make_dividend,
+    make_dividend_catch_up,
+    make_dividend_parallel,
+    make_dividend_set_based,
+    simulate_dividend,
+    write_down_shares_for_dividend,
+    written_down_current_value,
+)
+from solarpark.persistence.analytics import compute_yearly_rollups, get_yearly_rollups
+from solarpark.persistence.database import Base
+from solarpark.persistence.dividend_runs import claim_dividend_run, create_dividend_run, get_dividend_run_status
+from solarpark.persistence.models.dividend_runs import DividendRun
+from solarpark.persistence.models.dividends import Dividend
+from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.models.error_log import ErrorLog
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.payments import Payment
+from solarpark.persistence.models.shares import Share
+from solarpark.settings import settings
+
+PAYMENT_YEAR = 2023
+AMOUNT = 1000
+
+
+def seed_members(db, nr_of_members: int = 12):
+    db.add(Dividend(dividend_per_share=AMOUNT, payment_year=PAYMENT_YEAR, completed=False))
+    for member_id in range(1, nr_of_members + 1):
+        db.add(Member(id=member_id, firstname=f"Member {member_id}", email=f"member{member_id}@test.com"))
+
+        # Member 5 has no shares and member 6 has already received dividend for the year
+        nr_of_shares = 0 if member_id == 5 else member_id % 4 + 1
+        for share_nr in range(nr_of_shares):
+            db.add(
+                Share(
+                    member_id=member_id,
+                    initial_value=3000,
+                    current_value=500 if share_nr == 1 else 3000,
+                    purchased_at=datetime(PAYMENT_YEAR - share_nr % 3, 6, 1),
+                    from_internal_account=False,
+                )
+            )
+
+        db.add(
+            Economics(
+                member_id=member_id,
+                nr_of_shares=nr_of_shares,
+                total_investment=nr_of_shares * 3000,
+                current_value=nr_of_shares * 3000,
+                reinvested=0,
+                account_balance=member_id * 700,
+                pay_out=member_id % 3 == 0,
+                disbursed=0,
+                last_dividend_year=PAYMENT_YEAR if member_id == 6 else PAYMENT_YEAR - 1,
+            )
+        )
+    db.commit()
+
+
+def dividend_result(db):
+    economics = [
+        (
+            row.member_id,
+            row.nr_of_shares,
+            row.total_investment,
+            row.current_value,
+            row.reinvested,
+            row.account_balance,
+            row.disbursed,
+            row.last_dividend_year,
+        )
+        for row in db.query(Economics).order_by(Economics.id)
+    ]
+    shares = [
+        (row.member_id, row.current_value, row.purchased_at, row.from_internal_account)
+        for row in db.query(Share).order_by(Share.member_id, Share.id)
+    ]
+    payments = [(row.member_id, row.year, row.amount) for row in db.query(Payment).order_by(Payment.member_id)]
+    errors = sorted(row.member_id for row in db.query(ErrorLog))
+    completed = db.query(Dividend).filter(Dividend.payment_year == PAYMENT_YEAR).one().completed
+
+    return economics, shares, payments, errors, completed
+
+
+@pytest.fixture
+def member_result(session_factory: sessionmaker):
+    with session_factory() as db:
+        seed_members(db)
+    make_dividend(AMOUNT, PAYMENT_YEAR)
+
+    with session_factory() as db:
+        result = dividend_result(db)
+
+    Base.metadata.drop_all(bind=session_factory.kw["bind"])
+    Base.metadata.create_all(bind=session_factory.kw["bind"])
+    return result
+
+
+@pytest.mark.parametrize("batch_size", [5, None])
+def test_set_based_dividend_matches_member_dividend(session_factory: sessionmaker, member_result, batch_size):
+    with session_factory() as db:
+        seed_members(db)
+    make_dividend_set_based(AMOUNT, PAYMENT_YEAR, batch_size=batch_size)
+
+    with session_factory() as db:
+        assert dividend_result(db) == member_result
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [
+        make_dividend,
+        partial(make_dividend, commit_strategy="member"),
+        make_dividend_set_based,
+    ],
+)
+def test_dividend_updates_yearly_rollups(session_factory: sessionmaker, engine):
+    with session_factory() as db:
+        seed_members(db)
+        get_yearly_rollups(db, fresh=True)
+    engine(AMOUNT, PAYMENT_YEAR)
+
+    with session_factory() as db:
+        stored = {row.year: row for row in get_yearly_rollups(db)["data"]}
+        rollups = compute_yearly_rollups(db)
+        assert sorted(stored) == sorted(rollups)
+        for year, rollup in rollups.items():
+            assert {name: getattr(stored[year], name) for name in rollup} == rollup
+
+
+def test_member_dividend(member_result):
+    economics, shares, payments, errors, completed = member_result
+
+    assert completed
+    assert errors == ["5"]
+    assert [payment[0] for payment in payments] == [3, 9, 12]
+    assert len([share for share in shares if share[3]]) > 0
+    assert all(row[7] == PAYMENT_YEAR for row in economics if row[0] != 5)
+
+
+def test_member_dividend_prefetches_shares_per_batch(session_factory: sessionmaker):
+    with session_factory() as db:
+        seed_members(db, nr_of_members=40)
+        # The run is created up front, counting the economics for its progress is not part of the dividend
+        dividend_run_id = create_dividend_run(
+            db, DividendRunCreateRequest(payment_year=PAYMENT_YEAR, engine="member")
+        ).id
+
+    selects = []
+
+    def count_selects(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(re.search(r"FROM (\w+)", statement).group(1))
+
+    event.listen(session_factory.kw["bind"], "before_cursor_execute", count_selects)
+    make_dividend(AMOUNT, PAYMENT_YEAR, dividend_run_id=dividend_run_id)
+    event.remove(session_factory.kw["bind"], "before_cursor_execute", count_selects)
+
+    # Loading the run, then one economics and one shares query per batch of 20 and a last empty economics page,
+    # regardless of the number of members
+    assert selects == ["dividend_runs", "economics", "shares", "economics", "shares", "economics"]
+
+
+def test_member_dividend_resumes_from_checkpoint(session_factory: sessionmaker):
+    with session_factory() as db:
+        seed_members(db)
+        # A run interrupted after the first six economics rows
+        dividend_run = DividendRun(
+            payment_year=PAYMENT_YEAR,
+            engine="member",
+            is_historical_fulfillment=False,
+            status="running",
+            last_economics_id=6,
+            members_processed=4,
+            members_skipped=1,
+            members_failed=1,
+        )
+        db.add(dividend_run)
+        db.commit()
+        dividend_run_id = dividend_run.id
+
+    make_dividend(AMOUNT, PAYMENT_YEAR, dividend_run_id=dividend_run_id)
+
+    with session_factory() as db:
+        economics = db.query(Economics).order_by(Economics.id).all()
+        assert [row.last_dividend_year for row in economics[:6]] == [PAYMENT_YEAR - 1] * 4 + [
+            PAYMENT_YEAR - 1,
+            PAYMENT_YEAR,
+        ]
+        assert [row.last_dividend_year for row in economics[6:]] == [PAYMENT_YEAR] * 6
+
+        dividend_run = db.get(DividendRun, dividend_run_id)
+        assert dividend_run.status == "completed"
+        assert dividend_run.last_economics_id == 12
+        assert dividend_run.members_processed == 10
+        assert dividend_run.members_skipped == 1
+        assert dividend_run.members_failed == 1
+
+
+def test_simulate_dividend_matches_member_dividend(session_factory: sessionmaker):
+    with session_factory() as db:
+        seed_members(db)
+        simulation = simulate_dividend(db, AMOUNT, PAYMENT_YEAR)
+        shares_before = db.query(Share).count()
+
+    make_dividend(AMOUNT, PAYMENT_YEAR)
+
+    with session_factory() as db:
+        assert simulation["members_without_shares"] == [5]
+        assert simulation["members_already_done"] == [6]
+        assert simulation["total_payout"] == sum(payment.amount for payment in db.query(Payment))
+        assert simulation["nr_of_payouts"] == db.query(Payment).count()
+        assert simulation["nr_of_reinvested_shares"] == db.query(Share).count() - shares_before
+        assert simulation["total_current_value"] == sum(economics.current_value for economics in db.query(Economics))
+        assert {member["member_id"]: member["nr_of_shares"] for member in simulation["members"]} == {
+            economics.member_id: economics.nr_of_shares
+            for economics in db.query(Economics).filter(Economics.member_id.not_in([5, 6]))
+        }
+
+
+def test_member_dividend_without_bulk_insert_matches(session_factory: sessionmaker, member_result):
+    with session_factory() as db:
+        seed_members(db)
+    make_dividend(AMOUNT, PAYMENT_YEAR, bulk_insert=False)
+
+    with session_factory() as db:
+        assert dividend_result(db) == member_result
+
+
+def test_member_dividend_commit_per_member_matches(session_factory: sessionmaker, member_result):
+    with session_factory() as db:
+        seed_members(db)
+    make_dividend(AMOUNT, PAYMENT_YEAR, commit_strategy="member")
+
+    with session_factory() as db:
+        assert dividend_result(db) == member_result
+
+
+@pytest.mark.parametrize("commit_strategy, nr_of_commits", [("member", 10), ("batch", 1)])
+def test_member_dividend_commits(session_factory: sessionmaker, commit_strategy, nr_of_commits):
+    with session_factory() as db:
+        seed_members(db)
+
+    commits = []
+
+    def count_commits(conn):
+        commits.append(conn)
+
+    event.listen(session_factory.kw["bind"], "commit", count_commits)
+    make_dividend(AMOUNT, PAYMENT_YEAR, commit_strategy=commit_strategy)
+    event.remove(session_factory.kw["bind"], "commit", count_commits)
+
+    # Besides the members' or the batch's commit: creating, checkpointing and completing the run, the error of the
+    # member without shares is committed with the checkpoint
+    assert len(commits) == nr_of_commits + 3
+
+
+def test_member_dividend_batch_commit_rolls_back_failed_member(session_factory: sessionmaker, monkeypatch):
+    with session_factory() as db:
+        seed_members(db)
+        shares_before = [share.current_value for share in db.query(Share).filter(Share.member_id == 7)]
+
+    calculate_member_dividend = persistence.calculate_member_dividend
+
+    def failing_calculation(member_economics, **kwargs):
+        if member_economics.member_id == 7:
+            raise RuntimeError("calculation failed")
+        return calculate_member_dividend(member_economics, **kwargs)
+
+    monkeypatch.setattr(persistence, "calculate_member_dividend", failing_calculation)
+    make_dividend(AMOUNT, PAYMENT_YEAR, commit_strategy="batch")
+
+    with session_factory() as db:
+        # The failed member's share write-down is rolled back with its savepoint, the rest of the batch is kept
+        assert [share.current_value for share in db.query(Share).filter(Share.member_id == 7)] == shares_before
+        assert db.query(Economics).filter(Economics.member_id == 7).one().last_dividend_year == PAYMENT_YEAR - 1
+        assert db.query(Economics).filter(Economics.last_dividend_year == PAYMENT_YEAR).count() == 10
+        assert sorted(row.member_id for row in db.query(ErrorLog)) == ["5", "7"]
+
+        dividend_run = db.query(DividendRun).one()
+        assert (dividend_run.members_processed, dividend_run.members_skipped, dividend_run.members_failed) == (
+            9,
+            1,
+            2,
+        )
+
+
+def test_member_dividend_failed_batch_commit_keeps_member_errors(session_factory: sessionmaker, monkeypatch):
+    with session_factory() as db:
+        seed_members(db)
+        shares_before = {share.id: share.current_value for share in db.query(Share)}
+
+    def failing_write_down(db, share_ids, amount):
+        raise RuntimeError("write-down failed")
+
+    monkeypatch.setattr(persistence, "write_down_shares", failing_write_down)
+    make_dividend(AMOUNT, PAYMENT_YEAR, commit_strategy="batch")
+
+    with session_factory() as db:
+        # The error of the member without shares is written after the failed batch commit, not rolled back with it
+        assert [(row.member_id, row.comment.split(",")[0]) for row in db.query(ErrorLog).order_by(ErrorLog.id)] == [
+            (None, "Error: no dividend done for economics batch ending at 12"),
+            ("5", "Error: no shares found"),
+        ]
+        assert {share.id: share.current_value for share in db.query(Share).filter(Share.id.in_(shares_before))} == (
+            shares_before
+        )
+        # The batch is rolled back as a whole on PostgreSQL, on SQLite the members were committed by their savepoints
+        nr_of_members_done = 1 if session_factory.kw["bind"].dialect.name == "postgresql" else 11
+        assert db.query(Economics).filter(Economics.last_dividend_year == PAYMENT_YEAR).count() == nr_of_members_done
+
+        dividend_run = db.query(DividendRun).one()
+        assert (dividend_run.members_processed, dividend_run.members_failed) == (0, 11)
+
+
+def test_write_down_matches_computed_share_value(session_factory: sessionmaker):
+    with session_factory() as db:
+        seed_members(db)
+        shares_by_member = {
+            member_id: db.query(Share).filter(Share.member_id == member_id).order_by(Share.id).all()
+            for member_id in [2, 3, 4]
+        }
+        expected = {
+            member_id: written_down_current_value(shares, PAYMENT_YEAR, AMOUNT)
+            for member_id, shares in shares_by_member.items()
+        }
+        statements = []
+
+        def count_statements(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+            statements.append(statement)
+
+        event.listen(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        write_down_shares_for_dividend(db, [2, 3, 4], PAYMENT_YEAR, AMOUNT)
+        event.remove(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        db.commit()
+
+        assert len(statements) == 1
+        for member_id in [2, 3, 4]:
+            shares = db.query(Share).filter(Share.member_id == member_id).all()
+            assert expected[member_id] == sum(share.current_value for share in shares)
+        assert [share.current_value for share in db.query(Share).filter(Share.member_id == 3).order_by(Share.id)] == [
+            3000,
+            0,
+            2000,
+            3000,
+        ]
+
+
+@pytest.mark.parametrize("engine", [DividendEngine.MEMBER, DividendEngine.SET_BASED])
+def test_parallel_dividend_matches_member_dividend(session_factory: sessionmaker, member_result, engine):
+    with session_factory() as db:
+        seed_members(db)
+    make_dividend_parallel(AMOUNT, PAYMENT_YEAR, engine, parallelism=3)
+
+    with session_factory() as db:
+        assert dividend_result(db) == member_result
+
+        dividend_run = db.query(DividendRun).filter(DividendRun.parent_id.is_(None)).one()
+        partitions = db.query(DividendRun).filter(DividendRun.parent_id == dividend_run.id).all()
+        assert dividend_run.status == "completed"
+        assert [(partition.last_economics_id, partition.end_economics_id) for partition in partitions] == [
+            (4, 4),
+            (8, 8),
+            (12, 12),
+        ]
+        assert (dividend_run.members_processed, dividend_run.members_skipped, dividend_run.members_failed) == (
+            10,
+            1,
+            1,
+        )
+
+
+def test_parallel_dividend_not_completed_when_partition_fails(session_factory: sessionmaker, monkeypatch):
+    with session_factory() as db:
+        seed_members(db)
+
+    def failing_engine(amount, payment_year, is_historical_fulfillment=False, dividend_run_id=None):
+        if dividend_run_id % 2:
+            raise RuntimeError("worker lost")
+        make_dividend(amount, payment_year, is_historical_fulfillment, dividend_run_id)
+
+    monkeypatch.setitem(persistence.dividend_engines, DividendEngine.MEMBER, failing_engine)
+    make_dividend_parallel(AMOUNT, PAYMENT_YEAR, DividendEngine.MEMBER, parallelism=3)
+
+    with session_factory() as db:
+        dividend_run = db.query(DividendRun).filter(DividendRun.parent_id.is_(None)).one()
+        assert dividend_run.status == "failed"
+        assert not db.query(Dividend).filter(Dividend.payment_year == PAYMENT_YEAR).one().completed
+
+
+def test_dividend_run_status(session_factory: sessionmaker):
+    with session_factory() as db:
+        seed_members(db)
+        # Halfway through the economics after 100 seconds
+        running = DividendRun(
+            payment_year=PAYMENT_YEAR,
+            engine="member",
+            is_historical_fulfillment=False,
+            status="running",
+            last_economics_id=6,
+            total_economics=12,
+            members_processed=4,
+            members_skipped=1,
+            members_failed=1,
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=100),
+        )
+        db.add(running)
+        db.commit()
+
+        status = get_dividend_run_status(db, running)
+        assert status["elapsed_seconds"] == pytest.approx(100, abs=5)
+        assert status["members_per_second"] == pytest.approx(0.06, rel=0.05)
+        assert status["eta_seconds"] == pytest.approx(100, abs=5)
+
+        # Resumed 50 seconds ago after lying interrupted, with 4 members done before and 2 since
+        running.created_at = datetime.now(timezone.utc) - timedelta(seconds=1000)
+        running.started_at = datetime.now(timezone.utc) - timedelta(seconds=50)
+        running.members_done_at_start = 4
+        db.commit()
+
+        status = get_dividend_run_status(db, running)
+        assert status["elapsed_seconds"] == pytest.approx(50, abs=5)
+        assert status["members_per_second"] == pytest.approx(0.04, rel=0.1)
+        assert status["eta_seconds"] == pytest.approx(150, rel=0.1)
+
+    make_dividend(AMOUNT, PAYMENT_YEAR)
+
+    with session_factory() as db:
+        finished = db.query(DividendRun).filter(DividendRun.id != running.id).one()
+        status = get_dividend_run_status(db, finished)
+        assert status["total_economics"] == 12
+        assert (status["members_processed"], status["members_skipped"], status["members_failed"]) == (10, 1, 1)
+        assert status["shares_created"] == db.query(Share).filter(Share.from_internal_account.is_(True)).count()
+        assert status["payouts_created"] == db.query(Payment).count() == 3
+        assert status["eta_seconds"] == 0
+
+
+def test_claim_dividend_run_only_when_heartbeat_is_stale(session_factory: sessionmaker):
+    with session_factory() as db:
+        dividend_run = create_dividend_run(db, DividendRunCreateRequest(payment_year=PAYMENT_YEAR, engine="member"))
+        # A worker still holds the run
+        assert not claim_dividend_run(db, dividend_run)
+
+        dividend_run.heartbeat_at = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.DIVIDEND_RUN_LEASE_SECONDS + 1
+        )
+        db.commit()
+        with session_factory() as other_db:
+            # Both resumes see the stale heartbeat, only the first claim gets the run
+            other_run = other_db.get(DividendRun, dividend_run.id)
+            assert claim_dividend_run(db, dividend_run)
+            assert not claim_dividend_run(other_db, other_run)
+
+        # The claim renewed the lease
+        assert not claim_dividend_run(db, dividend_run)
+
+        dividend_run.status = "failed"
+        db.commit()
+        assert claim_dividend_run(db, dividend_run)
+        assert dividend_run.status == "running"
+
+
+def test_dividend_catch_up_matches_yearly_historical_dividends(session_factory: sessionmaker):
+    # No dividend the middle year, the fulfill endpoint only marks such a year completed
+    amounts = {PAYMENT_YEAR: AMOUNT, PAYMENT_YEAR + 1: 0, PAYMENT_YEAR + 2: 400}
+
+    def seed(db):
+        seed_members(db)
+        for payment_year in [PAYMENT_YEAR + 1, PAYMENT_YEAR + 2]:
+            db.add(Dividend(dividend_per_share=amounts[payment_year], payment_year=payment_year, completed=False))
+        db.commit()
+
+    def result(db):
+        economics, shares, payments, _, _ = dividend_result(db)
+        completed = [row.completed for row in db.query(Dividend).order_by(Dividend.payment_year)]
+        return economics, shares, payments, completed
+
+    with session_factory() as db:
+        seed(db)
+    for payment_year, amount in amounts.items():
+        if amount:
+            make_dividend(amount, payment_year, is_historical_fulfillment=True)
+        else:
+            with session_factory() as db:
+                db.query(Dividend).filter(Dividend.payment_year == payment_year).update({"completed": True})
+                db.commit()
+
+    with session_factory() as db:
+        yearly_result = result(db)
+
+    Base.metadata.drop_all(bind=session_factory.kw["bind"])
+    Base.metadata.create_all(bind=session_factory.kw["bind"])
+    with session_factory() as db:
+        seed(db)
+    make_dividend_catch_up(amounts)
+
+    with session_factory() as db:
+        assert result(db) == yearly_result
+        assert all(row[7] == PAYMENT_YEAR + 2 for row in yearly_result[0] if row[0] != 5)
+
+        dividend_run = db.query(DividendRun).one()
+        assert (dividend_run.engine, dividend_run.status, dividend_run.payment_year) == (
+            "catch_up",
+            "completed",
+            PAYMENT_YEAR + 2,
+        )
+        assert (dividend_run.members_processed, dividend_run.members_failed) == (11, 1)
@@ -1,8 +1,17 @@
 # pylint: disable=W0621
 
+from datetime import datetime
+
 import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
 
-from solarpark.tests.conftest import Fixture
+from solarpark.api.admin import create_economics_for_all_members
+from solarpark.persistence.members import stream_member_ids_and_emails
+from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.shares import Share
+from solarpark.tests.conftest import Fixture, TestingSessionLocal
 
 
 @pytest.fixture
@@ -104,6 +113,47 @@ def test_update_economics(fixture: Fixture, update_economics):
     assert response.json()["data"]["current_value"] == 6000
 
 
+def test_get_economics_by_member_id_list(fixture: Fixture):
+    with TestingSessionLocal() as db:
+        db.add_all([Member(id=member_id, email=f"member{member_id}@test.com") for member_id in [901, 902]])
+        rows = [
+            Economics(
+                member_id=member_id,
+                nr_of_shares=1,
+                total_investment=3000,
+                current_value=3000,
+                account_balance=0,
+                pay_out=False,
+                disbursed=0,
+                last_dividend_year=2022,
+            )
+            for member_id in [902, 901]
+        ]
+        db.add_all(rows)
+        db.commit()
+        economics_ids = {row.member_id: row.id for row in rows}
+
+    try:
+        response = fixture.client.get("/economics", params={"filter": '{"member_id": [902, 901, 999]}'})
+        assert response.status_code == 200
+        assert [row["member_id"] for row in response.json()["data"]] == [901, 902]
+        assert response.json()["total"] == 2
+        assert response.json()["by_member"] == {
+            "902": [economics_ids[902]],
+            "901": [economics_ids[901]],
+            "999": [],
+        }
+
+        for member_ids in ['[901, "902"]', "[[901, 902]]", "[901, true]"]:
+            response = fixture.client.get("/economics", params={"filter": f'{{"member_id": {member_ids}}}'})
+            assert response.status_code == 422
+    finally:
+        with TestingSessionLocal() as db:
+            db.query(Economics).filter(Economics.member_id.in_([901, 902])).delete()
+            db.query(Member).filter(Member.id.in_([901, 902])).delete()
+            db.commit()
+
+
 def test_delete_economics(fixture: Fixture):
     response = fixture.client.delete("/economics/1")
     assert response.status_code == 200
@@ -112,3 +162,48 @@ def test_delete_economics(fixture: Fixture):
 def test_get_economics_after_delete(fixture: Fixture):
     response = fixture.client.get("/economics/1")
     assert response.status_code == 404
+
+
+def test_create_economics_for_all_members_while_streaming_members(session_factory: sessionmaker):
+    with session_factory() as db:
+        for member_id in range(2, 7):
+            db.add(Member(id=member_id, email=f"member{member_id}@test.com" if member_id != 4 else ""))
+            db.add_all(
+                Share(
+                    member_id=member_id,
+                    initial_value=3000,
+                    current_value=3000,
+                    purchased_at=datetime(2020, 1, 1),
+                    from_internal_account=False,
+                )
+                for _ in range(member_id % 3)
+            )
+        db.commit()
+
+        assert list(stream_member_ids_and_emails(db)) == [
+            (2, "member2@test.com"),
+            (3, "member3@test.com"),
+            (4, ""),
+            (5, "member5@test.com"),
+            (6, "member6@test.com"),
+        ]
+
+        # Read two members at a time
+        statements = []
+
+        def count_statements(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+            statements.append(statement)
+
+        event.listen(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        assert [member_id for member_id, _ in stream_member_ids_and_emails(db, batch_size=2)] == [2, 3, 4, 5, 6]
+        event.remove(session_factory.kw["bind"], "before_cursor_execute", count_statements)
+        assert len(statements) == 3 and all("LIMIT" in statement for statement in statements)
+
+        # Members without shares get no economics
+        create_economics_for_all_members(db)
+        economics = db.query(Economics).order_by(Economics.member_id).all()
+        assert [(row.member_id, row.nr_of_shares, row.total_investment) for row in economics] == [
+            (2, 2, 6000),
+            (4, 1, 3000),
+            (5, 2, 6000),
+        ]
@@ -1,7 +1,23 @@
 # pylint: disable=W0621
 
+import threading
+from datetime import datetime
+
 import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
 
+from solarpark.models.members import MemberCreateRequest, MemberUpdateRequest, SingleMemberDetail
+from solarpark.persistence import delete_all_member_data, members
+from solarpark.persistence.counts import TotalCount, count_rows
+from solarpark.persistence.member_index import autocomplete_members, get_member_index
+from solarpark.persistence.members import find_member, get_all_members, get_member_detail
+from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.payments import Payment
+from solarpark.persistence.models.shares import Share
+from solarpark.persistence.search import create_trigram_indexes
 from solarpark.tests.conftest import Fixture
 
 
@@ -65,6 +81,256 @@ def test_get_member_does_not_exist(fixture: Fixture):
     assert response.status_code == 404
 
 
+def test_search_and_autocomplete_routes_not_shadowed_by_detail(fixture: Fixture):
+    response = fixture.client.get("/members/search/detail")
+    assert response.status_code == 200
+
+    response = fixture.client.get("/members/autocomplete/detail")
+    assert response.status_code == 200
+    assert response.json()["data"] == []
+
+    response = fixture.client.get("/members/3/detail")
+    assert response.status_code == 404
+
+
 def test_delete_member(fixture: Fixture):
     response = fixture.client.delete("/members/1")
     assert response.status_code == 200
+
+
+@pytest.mark.parametrize("sort", [[], ["id", "DESC"], ["firstname", "ASC"], ["firstname", "DESC"]])
+def test_get_all_members_cursor_pages(session_factory: sessionmaker, sort):
+    with session_factory() as db:
+        # Repeated and missing first names to page through ties and NULLs
+        for member_id in range(1, 26):
+            firstname = None if member_id % 5 == 0 else f"Member {member_id % 4}"
+            db.add(Member(id=member_id, firstname=firstname, email=f"member{member_id}@test.com"))
+        db.commit()
+
+        all_members = [member.id for member in get_all_members(db, sort=sort, range=[0, 100])["data"]]
+        first_page = get_all_members(db, sort=sort, range=[0, 7])
+
+        cursor_members = []
+        cursor = None
+        while True:
+            page = get_all_members(db, sort=sort, range=[0, 7], cursor=cursor)
+            cursor_members.extend(member.id for member in page["data"])
+            assert page["total"] == 25
+            if page["next_cursor"] is None:
+                break
+            cursor = page["next_cursor"]
+
+        assert cursor_members == all_members
+        assert sorted(all_members) == list(range(1, 26))
+        assert [member.id for member in first_page["data"]] == all_members[:7]
+        assert (
+            get_all_members(db, sort=sort, range=[7, 7])["data"]
+            == get_all_members(db, sort=sort, range=[0, 7], cursor=first_page["next_cursor"])["data"]
+        )
+
+
+def test_get_members_invalid_cursor(fixture: Fixture):
+    response = fixture.client.get("/members", params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+
+    response = fixture.client.get("/members", params={"sort": '["no_such_field", "ASC"]'})
+    assert response.status_code == 400
+
+
+def test_member_count_cached_until_written(session_factory: sessionmaker):
+    counts = []
+
+    def count_counts(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+        if "count(" in statement:
+            counts.append(statement)
+
+    event.listen(session_factory.kw["bind"], "before_cursor_execute", count_counts)
+    with session_factory() as db, session_factory() as other_db:
+        db.add_all([Member(email=f"member{member_id}@test.com") for member_id in range(3)])
+        db.commit()
+
+        assert count_rows(db, Member) == 3
+        assert count_rows(other_db, Member) == 3
+        assert len(counts) == 1
+
+        # Writes through any session invalidate the count, ORM objects as well as bulk inserts and deletes
+        other_db.execute(insert(Member), [{"email": "bulk@test.com"}])
+        assert count_rows(other_db, Member) == 4
+        assert count_rows(db, Member) == 3
+        other_db.commit()
+        assert count_rows(db, Member) == 4
+
+        db.query(Member).filter(Member.email == "bulk@test.com").delete()
+        db.commit()
+        assert count_rows(other_db, Member) == 3
+        assert count_rows(db, Member, TotalCount.ESTIMATED) == 3
+        assert len(counts) == 5
+    event.remove(session_factory.kw["bind"], "before_cursor_execute", count_counts)
+
+
+def test_get_members_estimated_total(fixture: Fixture):
+    response = fixture.client.get("/members", params={"total": "estimated"})
+    assert response.status_code == 200
+    assert response.json()["total"] == len(response.json()["data"])
+
+    response = fixture.client.get("/members", params={"total": "rough"})
+    assert response.status_code == 422
+
+
+def test_find_member_ranks_and_limits_matches(session_factory: sessionmaker, monkeypatch):
+    with session_factory() as db:
+        db.add_all(
+            [
+                Member(id=2, firstname="Anna", lastname="Svensson", email="anna@test.com"),
+                Member(id=3, firstname="Johanna", lastname="Andersson", email="jo@test.com"),
+                Member(id=4, org_name="Annas Bygg AB", email="info@bygg.se"),
+                Member(id=5, firstname="Erik", lastname="Berg", email="erik_berg@test.com"),
+            ]
+        )
+        db.commit()
+
+        assert [member.id for member in find_member(db, "anna")["data"]] == [2, 4, 3]
+        assert [member.id for member in find_member(db, "Anna Svensson")["data"]] == [2]
+        assert [member.id for member in find_member(db, "k_b")["data"]] == [5]
+        assert find_member(db, "  ")["data"] == []
+
+        monkeypatch.setattr("solarpark.persistence.search.settings.SEARCH_LIMIT", 2)
+        assert find_member(db, "anna")["total"] == 2
+
+
+def test_trigram_indexes_created_idempotently(session_factory: sessionmaker):
+    statements = []
+
+    class RecordingConnection:
+        dialect = postgresql.dialect()
+
+        def execute(self, statement):
+            statements.append(str(statement.compile(dialect=self.dialect)))
+
+    create_trigram_indexes(RecordingConnection())
+    assert statements[0] == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+    assert [statement.split(" ON ")[0] for statement in statements[1:]] == [
+        "CREATE INDEX IF NOT EXISTS ix_members_search",
+        "CREATE INDEX IF NOT EXISTS ix_leads_search",
+    ]
+    assert all("USING gin" in statement and "gin_trgm_ops" in statement for statement in statements[1:])
+
+    # Nothing to create on other databases
+    with session_factory.kw["bind"].begin() as connection:
+        create_trigram_indexes(connection)
+
+
+def test_autocomplete_members_follows_member_writes(session_factory: sessionmaker, monkeypatch):
+    with session_factory() as db:
+        db.add_all(
+            [
+                Member(id=12, firstname="Anna", lastname="Svensson", email="anna@test.com"),
+                Member(id=13, org_name="Annas Bygg AB", email="info@bygg.se"),
+            ]
+        )
+        db.commit()
+
+        def suggestions(prefix, limit=None):
+            return [member["id"] for member in autocomplete_members(db, prefix, limit)["data"]]
+
+        assert suggestions("ann") == [12, 13]
+        assert suggestions("anna sv") == [12]
+        assert suggestions("1") == [12, 13]
+        assert suggestions("ann", limit=1) == [12]
+
+        created = members.create_member(
+            db, MemberCreateRequest(firstname="Annika", lastname="Berg", email="ab@test.com")
+        )
+        assert suggestions("annik") == [created.id]
+
+        members.update_member(
+            db, created.id, MemberUpdateRequest(firstname="Karin", lastname="Berg", email="kb@test.com")
+        )
+        assert suggestions("annik") == []
+        assert suggestions("karin b") == [created.id]
+
+        assert delete_all_member_data(db, created.id)
+        assert suggestions("karin") == []
+
+        monkeypatch.setattr("solarpark.persistence.member_index.settings.AUTOCOMPLETE_LIMIT", 1)
+        assert suggestions("ann", limit=5) == [12]
+
+
+def test_member_index_rebuilt_in_background(session_factory: sessionmaker, monkeypatch):
+    with session_factory() as db:
+        db.add_all(
+            [
+                Member(id=12, firstname="Anna", lastname="Svensson", email="anna@test.com"),
+                Member(id=13, firstname="Bertil", email="bertil@test.com"),
+            ]
+        )
+        db.commit()
+        index = get_member_index(db)
+
+        # Written to the database and the index while a build is reading the members, after its read
+        assert index.start_build()
+        assert not index.start_build()
+        index.put(Member(id=12, firstname="Annika", lastname="Svensson", email="anna@test.com"))
+        index.remove(13)
+        index.build(db)
+        assert [member["firstname"] for member in index.complete("ann", 10)] == ["Annika"]
+        assert index.complete("bertil", 10) == []
+
+        # Stale, served as it is while one rebuild runs in the background
+        db.add(Member(id=14, firstname="Cecilia", email="cecilia@test.com"))
+        db.commit()
+        monkeypatch.setattr("solarpark.persistence.member_index.settings.MEMBER_INDEX_MAX_AGE", -1)
+        assert get_member_index(db) is index
+        for thread in threading.enumerate():
+            if thread.name == "member-index-build":
+                thread.join()
+        assert [member["id"] for member in index.complete("ceci", 10)] == [14]
+
+
+@pytest.mark.parametrize("nr_of_shares", [1, 30])
+def test_member_detail_loads_in_fixed_number_of_queries(session_factory: sessionmaker, nr_of_shares):
+    with session_factory() as db:
+        db.add(Member(id=2, firstname="Anna", email="anna@test.com"))
+        db.add(
+            Economics(
+                member_id=2,
+                nr_of_shares=nr_of_shares,
+                total_investment=nr_of_shares * 3000,
+                current_value=nr_of_shares * 3000,
+                reinvested=0,
+                account_balance=0,
+                disbursed=0,
+                pay_out=False,
+                last_dividend_year=2022,
+            )
+        )
+        db.add_all(
+            Share(
+                member_id=2,
+                initial_value=3000,
+                current_value=3000,
+                purchased_at=datetime(2020, 1, 1),
+                from_internal_account=False,
+            )
+            for _ in range(nr_of_shares)
+        )
+        db.add_all(Payment(member_id=2, year=year, amount=100, paid_out=True) for year in (2021, 2022))
+        db.commit()
+
+    selects = []
+
+    def count_selects(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=W0613
+        if statement.startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(session_factory.kw["bind"], "before_cursor_execute", count_selects)
+    with session_factory() as db:
+        detail = SingleMemberDetail.model_validate({"data": get_member_detail(db, 2)}).data
+        assert get_member_detail(db, 3) is None
+    event.remove(session_factory.kw["bind"], "before_cursor_execute", count_selects)
+
+    assert detail.firstname == "Anna"
+    assert [economics.nr_of_shares for economics in detail.economics] == [nr_of_shares]
+    assert len(detail.shares) == nr_of_shares
+    assert [payment.year for payment in detail.payments] == [2021, 2022]
+    assert len(selects) == 5
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.payments import Payment
+from solarpark.persistence.payments import get_all_payments
+from solarpark.tests.conftest import Fixture, TestingSessionLocal
+
+
+def test_get_payments_by_member_id_list(fixture: Fixture):
+    with TestingSessionLocal() as db:
+        db.add_all([Member(id=member_id, email=f"member{member_id}@test.com") for member_id in [901, 902]])
+        rows = [Payment(member_id=member_id, year=2023, amount=500, paid_out=False) for member_id in [902, 901, 901]]
+        db.add_all(rows)
+        db.commit()
+        payment_ids = [row.id for row in rows]
+
+    try:
+        response = fixture.client.get("/payments", params={"filter": '{"member_id": [902, 901, 999]}'})
+        assert response.status_code == 200
+        assert [row["member_id"] for row in response.json()["data"]] == [901, 901, 902]
+        assert response.json()["total"] == 3
+        assert response.json()["by_member"] == {
+            "902": [payment_ids[0]],
+            "901": [payment_ids[1], payment_ids[2]],
+            "999": [],
+        }
+
+        for member_ids in ['[901, "902"]', "[[901, 902]]", "[901, true]"]:
+            response = fixture.client.get("/payments", params={"filter": f'{{"member_id": {member_ids}}}'})
+            assert response.status_code == 422
+    finally:
+        with TestingSessionLocal() as db:
+            db.query(Payment).filter(Payment.member_id.in_([901, 902])).delete()
+            db.query(Member).filter(Member.id.in_([901, 902])).delete()
+            db.commit()
+
+
+@pytest.mark.parametrize(
+    "sort", [["paid_out", "ASC"], ["paid_out", "DESC"], ["created_at", "ASC"], ["created_at", "DESC"]]
+)
+def test_get_all_payments_cursor_pages(session_factory: sessionmaker, sort):
+    with session_factory() as db:
+        db.add(Member(id=1, email="member1@test.com"))
+        for payment_id in range(1, 24):
+            # Timestamps set by the database next to ones with fractional seconds written from Python
+            created_at = datetime(2024, 1, 1, 12, 0, payment_id % 3, 500000) if payment_id % 4 == 0 else None
+            db.add(
+                Payment(
+                    id=payment_id,
+                    member_id=1,
+                    year=2023,
+                    amount=100,
+                    paid_out=payment_id % 3 == 0,
+                    created_at=created_at,
+                )
+            )
+        db.commit()
+
+        all_payments = [payment.id for payment in get_all_payments(db, sort=sort, range=[0, 100])["data"]]
+
+        cursor_payments = []
+        cursor = None
+        # Bounded, a cursor that does not advance would repeat its page forever
+        for _ in range(10):
+            page = get_all_payments(db, sort=sort, range=[0, 5], cursor=cursor)
+            cursor_payments.extend(payment.id for payment in page["data"])
+            if page["next_cursor"] is None:
+                break
+            cursor = page["next_cursor"]
+
+        assert cursor_payments == all_payments
+        assert sorted(all_payments) == list(range(1, 24))
@@ -1,8 +1,22 @@
 # pylint: disable=W0621
 
+from datetime import datetime
+
 import pytest
+from sqlalchemy.orm import sessionmaker
 
-from solarpark.tests.conftest import Fixture
+from solarpark.models.shares import ShareCreateRequest, ShareTransferRequest, ShareUpdateRequest
+from solarpark.persistence import shares
+from solarpark.persistence.models.economics import Economics
+from solarpark.persistence.models.members import Member
+from solarpark.persistence.models.shares import Share
+from solarpark.persistence.shares import (
+    all_members_with_shares,
+    count_all_shares,
+    get_share_statistics,
+    transfer_shares,
+)
+from solarpark.tests.conftest import Fixture, TestingSessionLocal
 
 
 @pytest.fixture
@@ -76,3 +90,210 @@ def test_get_share(fixture: Fixture):
     assert response.json()["data"]["from_internal_account"] == 0
     assert response.json()["data"]["initial_value"] == 3000
     assert response.json()["data"]["current_value"] == 2000
+
+
+def test_share_statistics_match_separate_counts(session_factory: sessionmaker):
+    with session_factory() as db:
+        # Member 1 is the solar park itself, every fourth member is an organization and member 6 has no shares
+        for member_id in range(1, 13):
+            org_name = f"Org {member_id}" if member_id % 4 == 0 else None
+            db.add(Member(id=member_id, org_name=org_name, email=f"member{member_id}@test.com"))
+            for share_nr in range(0 if member_id == 6 else member_id % 3 + 1):
+                db.add(
+                    Share(
+                        member_id=member_id,
+                        initial_value=3000,
+                        current_value=3000,
+                        purchased_at=datetime(2020, 1, 1),
+                        from_internal_account=share_nr == 1,
+                    )
+                )
+        db.commit()
+
+        all_shares, all_solarpark_shares, reinvested_shares, org_more_than_one_share = count_all_shares(db)
+        all_with_shares, org_with_shares = all_members_with_shares(db)
+
+        assert get_share_statistics(db) == {
+            "all_shares": all_shares,
+            "all_solarpark_shares": all_solarpark_shares,
+            "reinvested_shares": reinvested_shares,
+            "org_more_than_one_share": org_more_than_one_share,
+            "all_with_shares": all_with_shares,
+            "org_with_shares": org_with_shares,
+        }
+        assert (all_shares, all_solarpark_shares, reinvested_shares) == (21, 2, 8)
+        assert (org_more_than_one_share, all_with_shares, org_with_shares) == (2, 10, 3)
+
+
+def test_transfer_shares_recomputes_economics_of_every_member(session_factory: sessionmaker):
+    with session_factory() as db:
+        for member_id, values in [(2, [3000, 3000, 1000]), (3, [2000]), (4, [])]:
+            db.add(Member(id=member_id, email=f"member{member_id}@test.com"))
+            db.add(
+                Economics(
+                    member_id=member_id,
+                    nr_of_shares=len(values),
+                    total_investment=sum(values),
+                    current_value=sum(values),
+                    reinvested=0,
+                    account_balance=0,
+                    disbursed=0,
+                    last_dividend_year=2022,
+                )
+            )
+            for value in values:
+                db.add(
+                    Share(
+                        member_id=member_id,
+                        initial_value=value,
+                        current_value=value,
+                        purchased_at=datetime(2020, 1, 1),
+                        from_internal_account=False,
+                    )
+                )
+        db.commit()
+
+        with pytest.raises(ValueError):
+            transfer_shares(db, ShareTransferRequest(share_ids=[1, 99], member_id=4))
+        assert db.query(Share).filter(Share.member_id == 4).count() == 0
+
+        result = transfer_shares(db, ShareTransferRequest(share_ids=[1, 3, 4], member_id=4))
+        assert result["total"] == 3
+        assert {share.member_id for share in result["data"]} == {4}
+
+        economics = {row.member_id: row for row in db.query(Economics).populate_existing()}
+        assert (economics[2].nr_of_shares, economics[2].total_investment, economics[2].current_value) == (1, 3000, 3000)
+        assert (economics[3].nr_of_shares, economics[3].total_investment, economics[3].current_value) == (0, 0, 0)
+        assert (economics[4].nr_of_shares, economics[4].total_investment, economics[4].current_value) == (3, 6000, 6000)
+
+
+def test_transfer_shares_to_member_without_economics_rejected(session_factory: sessionmaker):
+    with session_factory() as db:
+        for member_id in (2, 3):
+            db.add(Member(id=member_id, email=f"member{member_id}@test.com"))
+        db.add(
+            Economics(
+                member_id=2,
+                nr_of_shares=1,
+                total_investment=3000,
+                current_value=3000,
+                reinvested=0,
+                account_balance=0,
+                disbursed=0,
+                last_dividend_year=2022,
+            )
+        )
+        db.add(
+            Share(
+                member_id=2,
+                initial_value=3000,
+                current_value=3000,
+                purchased_at=datetime(2020, 1, 1),
+                from_internal_account=False,
+            )
+        )
+        db.commit()
+
+        with pytest.raises(ValueError, match="member 3 has no economics"):
+            transfer_shares(db, ShareTransferRequest(share_ids=[1], member_id=3))
+
+        assert db.query(Share).one().member_id == 2
+        assert db.query(Economics).one().nr_of_shares == 1
+
+
+def test_share_changes_apply_economics_deltas(session_factory: sessionmaker):
+    with session_factory() as db:
+        for member_id in (2, 3):
+            db.add(Member(id=member_id, email=f"member{member_id}@test.com"))
+            db.add(
+                Economics(
+                    member_id=member_id,
+                    nr_of_shares=0,
+                    total_investment=0,
+                    current_value=0,
+                    reinvested=0,
+                    account_balance=0,
+                    disbursed=0,
+                    last_dividend_year=2022,
+                )
+            )
+        db.commit()
+
+        def totals():
+            return {
+                row.member_id: (row.nr_of_shares, row.total_investment, row.current_value)
+                for row in db.query(Economics).populate_existing()
+            }
+
+        purchased_at = datetime(2020, 1, 1)
+        for _ in range(2):
+            share = shares.create_share(
+                db,
+                ShareCreateRequest(
+                    member_id=2, initial_value=3000, purchased_at=purchased_at, from_internal_account=False
+                ),
+            )
+        assert totals() == {2: (2, 6000, 6000), 3: (0, 0, 0)}
+
+        shares.update_share(
+            db,
+            share.id,
+            ShareUpdateRequest(member_id=2, current_value=2500, purchased_at=purchased_at, from_internal_account=False),
+        )
+        assert totals() == {2: (2, 6000, 5500), 3: (0, 0, 0)}
+
+        shares.update_share(
+            db,
+            share.id,
+            ShareUpdateRequest(member_id=3, current_value=2000, purchased_at=purchased_at, from_internal_account=False),
+        )
+        assert totals() == {2: (1, 3000, 3000), 3: (1, 3000, 2000)}
+
+        assert shares.delete_share(db, share.id)
+        assert totals() == {2: (1, 3000, 3000), 3: (0, 0, 0)}
+
+
+def test_compact_sequences(fixture: Fixture):
+    response = fixture.client.post("/compact-sequences")
+    assert response.status_code == 200
+    last_share = fixture.client.get("/shares", params={"sort": '["id", "DESC"]', "range": "[0, 1]"}).json()["data"][0]
+    assert response.json()["data"]["shares"] == last_share["id"] + 1
+    assert response.json()["data"]["members"] > 1
+
+
+def test_get_shares_by_member_id_list(fixture: Fixture):
+    with TestingSessionLocal() as db:
+        db.add_all([Member(id=member_id, email=f"member{member_id}@test.com") for member_id in [901, 902]])
+        rows = [
+            Share(
+                member_id=member_id,
+                initial_value=3000,
+                current_value=3000,
+                purchased_at=datetime(2020, 1, 1),
+                from_internal_account=False,
+            )
+            for member_id in [902, 901, 902]
+        ]
+        db.add_all(rows)
+        db.commit()
+        share_ids = [row.id for row in rows]
+
+    try:
+        response = fixture.client.get("/shares", params={"filter": '{"member_id": [902, 901, 999]}'})
+        assert response.status_code == 200
+        assert [row["member_id"] for row in response.json()["data"]] == [901, 902, 902]
+        assert response.json()["total"] == 3
+        assert response.json()["by_member"] == {
+            "902": [share_ids[0], share_ids[2]],
+            "901": [share_ids[1]],
+            "999": [],
+        }
+
+        for member_ids in ['[901, "902"]', "[[901, 902]]", "[901, true]"]:
+            response = fixture.client.get("/shares", params={"filter": f'{{"member_id": {member_ids}}}'})
+            assert response.status_code == 422
+    finally:
+        with TestingSessionLocal() as db:
+            db.query(Share).filter(Share.member_id.in_([901, 902])).delete()
+            db.query(Member).filter(Member.id.in_([901, 902])).delete()
+            db.commit()